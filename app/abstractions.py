@@ -1,12 +1,127 @@
+import functools
+import inspect
 from abc import ABC, abstractmethod
-from typing import Any, Optional, Sequence
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Hashable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Sized,
+    TypeVar,
+    cast,
+)
 
-from app.custom_types import Column
+from app import constants
+from app.custom_types import Column, Index
+from app.query_events import (
+    DISABLED_INSTRUMENT,
+    DISABLED_QUERY_EVENT,
+    QueryEvent,
+)
+
+
+class QueryHook(ABC):
+    """Callbacks around every call of a Database, see Database.add_hook"""
+
+    @abstractmethod
+    def before_query(self, event: QueryEvent):
+        pass
+
+    @abstractmethod
+    def after_query(self, event: QueryEvent):
+        pass
+
+
+DatabaseMethod = TypeVar("DatabaseMethod", bound=Callable[..., Any])
+
+
+def instrumented(method: DatabaseMethod) -> DatabaseMethod:
+    """Report calls of the database method to its hooks
+
+    The call is shaped by its table and timed as a single execute phase,
+    the rows are counted from a sized values argument or a single value.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self: "Database", *args, **kwargs):
+        if not self._hooks:
+            return method(self, *args, **kwargs)
+        arguments = signature.bind(self, *args, **kwargs).arguments
+        with self._instrument(
+            method.__name__, arguments.get("table", "")
+        ) as event:
+            with event.phase("execute"):
+                result = method(self, *args, **kwargs)
+            values = arguments.get("values")
+            if isinstance(values, Sized):
+                event.row_count = len(values)
+            elif "value" in arguments:
+                event.row_count = 1
+            return result
+
+    return cast(DatabaseMethod, wrapper)
 
 
 class Database(ABC):
+    def __init__(self, slow_query_threshold: Optional[float] = None):
+        """Calls slower than slow_query_threshold seconds get their
+        query plan captured for the hooks
+        """
+        self._hooks: list[QueryHook] = []
+        self._slow_query_threshold = slow_query_threshold
+
+    def add_hook(self, hook: QueryHook):
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: QueryHook):
+        self._hooks.remove(hook)
+
+    def _instrument(
+        self, method: str, shape: str = ""
+    ) -> ContextManager[QueryEvent]:
+        """Pass the event of the enclosed call to the hooks
+
+        Without hooks a shared disabled event is yielded, its phases are
+        not timed and anything set on it is ignored.
+        """
+        if not self._hooks:
+            return DISABLED_INSTRUMENT
+        return self._report(QueryEvent(method=method, shape=shape))
+
+    @contextmanager
+    def _report(self, event: QueryEvent) -> Iterator[QueryEvent]:
+        for hook in self._hooks:
+            hook.before_query(event)
+        try:
+            yield event
+        except Exception as error:
+            # not GeneratorExit, a stream closed early is no error
+            event.error = error
+            raise
+        finally:
+            for hook in self._hooks:
+                hook.after_query(event)
+
+    def _is_slow(self, event: QueryEvent) -> bool:
+        return (
+            self._slow_query_threshold is not None
+            and event is not DISABLED_QUERY_EVENT
+            and event.seconds >= self._slow_query_threshold
+        )
+
     @abstractmethod
-    def create_table(self, table: str, columns: list[Column]):
+    def create_table(
+        self,
+        table: str,
+        columns: list[Column],
+        indexes: Optional[list[Index]] = None,
+    ):
         pass
 
     @abstractmethod
@@ -18,6 +133,23 @@ class Database(ABC):
     ):
         pass
 
+    @abstractmethod
+    def copy_batch(
+        self,
+        table: str,
+        columns: list[str],
+        values: Iterable[tuple[Any, ...]],
+    ):
+        pass
+
+    @abstractmethod
+    def reserve_ids(self, table: str, column: str, count: int) -> list[int]:
+        pass
+
+    @abstractmethod
+    def transaction(self) -> ContextManager[None]:
+        pass
+
     @abstractmethod
     def insert(
         self,
@@ -28,6 +160,25 @@ class Database(ABC):
     ) -> Any:
         pass
 
+    @abstractmethod
+    def upsert(
+        self,
+        table: str,
+        columns: list[str],
+        values: Sequence[tuple[Any, ...]],
+        conflict_columns: list[str],
+    ):
+        pass
+
+    @abstractmethod
+    def delete(
+        self,
+        table: str,
+        filter_columns: list[str],
+        values: Sequence[tuple[Any, ...]],
+    ):
+        pass
+
     @abstractmethod
     def data_exists(self, table: str) -> bool:
         pass
@@ -45,8 +196,81 @@ class Database(ABC):
     ) -> list[dict[str, Any]]:
         pass
 
+    @abstractmethod
+    def select_tuples(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]] = None,
+        left_ons: Optional[list[str]] = None,
+        right_ons: Optional[list[str]] = None,
+        filter_colummn: Optional[str] = None,
+        filter_value: Optional[Any] = None,
+    ) -> list[tuple[Any, ...]]:
+        pass
+
+    @abstractmethod
+    def select_iter(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]] = None,
+        left_ons: Optional[list[str]] = None,
+        right_ons: Optional[list[str]] = None,
+        filter_colummn: Optional[str] = None,
+        filter_value: Optional[Any] = None,
+        itersize: int = constants.SELECT_ITER_SIZE,
+    ) -> Iterator[tuple[Any, ...]]:
+        pass
+
+    @abstractmethod
+    def select_many(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]] = None,
+        left_ons: Optional[list[str]] = None,
+        right_ons: Optional[list[str]] = None,
+        filter_colummn: Optional[str] = None,
+        filter_values: Sequence[Any] = (),
+    ) -> list[dict[str, Any]]:
+        pass
+
+
+class AsyncDatabase(ABC):
+    @abstractmethod
+    async def select(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]] = None,
+        left_ons: Optional[list[str]] = None,
+        right_ons: Optional[list[str]] = None,
+        filter_colummn: Optional[str] = None,
+        filter_value: Optional[Any] = None,
+    ) -> list[dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def close(self):
+        pass
+
 
 class DatabaseLoader(ABC):
     @abstractmethod
     def load_initial_data(self, file_path: str):
         pass
+
+
+class Cache(ABC):
+    @abstractmethod
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        pass
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Optional
+
+import psycopg
+from psycopg import sql
+from psycopg.rows import DictRow, dict_row
+
+from app import constants
+from app.abstractions import AsyncDatabase
+from app.custom_types import SelectQuery
+from app.query_builders import compose_select
+from app.utils import chunked
+
+# connections return rows as dicts, see AsyncPostgreDB.connect
+DictRowConnection = psycopg.AsyncConnection[DictRow]
+# select waiting for the next pipeline together with its result future
+_PendingSelect = tuple[SelectQuery, "asyncio.Future[list[DictRow]]"]
+
+
+class AsyncPostgreDB(AsyncDatabase):
+    """PostgreSQL database for asyncio that pipelines concurrent selects
+
+    Selects issued during the same event loop iteration are sent together
+    in pipeline mode over one of the connections, so many concurrent
+    lookups share a few round trips.
+    """
+
+    def __init__(self, connections: list[DictRowConnection]):
+        self._connections: asyncio.Queue[DictRowConnection] = asyncio.Queue()
+        for connection in connections:
+            self._connections.put_nowait(connection)
+        self._connection_count = len(connections)
+        self._pending: list[_PendingSelect] = []
+        self._pipeline_tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    async def connect(
+        cls,
+        database: str,
+        user: str,
+        password: str,
+        host: str,
+        port: str,
+        connections: int = 1,
+    ) -> AsyncPostgreDB:
+        return cls(
+            [
+                await DictRowConnection.connect(
+                    dbname=database,
+                    user=user,
+                    password=password,
+                    host=host,
+                    port=port,
+                    autocommit=True,
+                    row_factory=dict_row,
+                )
+                for _ in range(connections)
+            ]
+        )
+
+    async def select(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]] = None,
+        left_ons: Optional[list[str]] = None,
+        right_ons: Optional[list[str]] = None,
+        filter_colummn: Optional[str] = None,
+        filter_value: Optional[Any] = None,
+    ) -> list[DictRow]:
+        """Queue select for the next pipeline and wait for its rows"""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[list[DictRow]] = loop.create_future()
+        if not self._pending:
+            loop.call_soon(self._flush)
+        self._pending.append(
+            (
+                SelectQuery(
+                    table,
+                    columns,
+                    join_tables,
+                    left_ons,
+                    right_ons,
+                    filter_colummn,
+                    filter_value,
+                ),
+                future,
+            )
+        )
+        return await future
+
+    def _flush(self):
+        """Send queued selects as pipelines, one per free connection"""
+        pending, self._pending = self._pending, []
+        for batch in chunked(pending, constants.ASYNC_PIPELINE_MAX_QUERIES):
+            task = asyncio.create_task(self._run_pipeline(batch))
+            self._pipeline_tasks.add(task)
+            task.add_done_callback(self._pipeline_tasks.discard)
+
+    async def _run_pipeline(self, batch: list[_PendingSelect]):
+        connection = await self._connections.get()
+        try:
+            async with connection.pipeline():
+                cursors = []
+                for query, _ in batch:
+                    cursor = connection.cursor()
+                    await cursor.execute(
+                        compose_select(
+                            sql,
+                            table=query.table,
+                            columns=query.columns,
+                            join_tables=query.join_tables,
+                            left_ons=query.left_ons,
+                            right_ons=query.right_ons,
+                            filter_colummn=query.filter_colummn
+                            if query.filter_value
+                            else None,
+                        ),
+                        (query.filter_value,) if query.filter_value else None,
+                    )
+                    cursors.append(cursor)
+                for (_, future), cursor in zip(batch, cursors):
+                    rows = await cursor.fetchall()
+                    if not future.done():
+                        future.set_result(rows)
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            self._connections.put_nowait(connection)
+
+    async def close(self):
+        if self._pipeline_tasks:
+            await asyncio.gather(*self._pipeline_tasks)
+        for _ in range(self._connection_count):
+            connection = await self._connections.get()
+            await connection.close()
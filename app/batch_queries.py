@@ -0,0 +1,196 @@
+import json
+from typing import Any, Callable, Iterable, Optional, TextIO
+
+from app import constants, repositories
+from app.models.journey import Journey
+from app.spatial_index import StationDistance
+from app.utils import chunked, json_default
+
+Query = dict[str, Any]
+
+# query name to the field holding the key of the bulk lookup
+_BULK_QUERY_KEYS = {
+    constants.BATCH_QUERY_BY_LINE_NAME: constants.NAME,
+    constants.BATCH_QUERY_BY_STATION_NAME: constants.NAME,
+    constants.BATCH_QUERY_BY_STATION_ID: constants.ID,
+}
+
+
+class BatchQueryError(ValueError):
+    pass
+
+
+def _get_field(query: Query, key: str, field_type: type) -> Any:
+    if key not in query:
+        raise BatchQueryError(f"{key} is missing")
+    value = query[key]
+    # json numbers may come without a fraction part
+    if field_type is float and isinstance(value, int):
+        value = float(value)
+    if not isinstance(value, field_type) or isinstance(value, bool):
+        raise BatchQueryError(f"{key} has wrong type")
+    return value
+
+
+def _journey_to_json(journey: Optional[Journey]) -> Optional[dict[str, Any]]:
+    if journey is None:
+        return None
+    return {
+        "stops": journey.stops,
+        "interchanges": journey.interchanges,
+        "legs": journey.legs,
+    }
+
+
+def _station_distances_to_json(
+    station_distances: list[StationDistance],
+) -> list[dict[str, Any]]:
+    return [
+        {"station": station, "distance": distance}
+        for station, distance in station_distances
+    ]
+
+
+def _get_query_name(query: Query) -> str:
+    """Return the query name, empty for missing or non-string names"""
+    query_name = query.get(constants.QUERY)
+    return query_name if isinstance(query_name, str) else ""
+
+
+def _parse_query(line: str) -> Query:
+    try:
+        query = json.loads(line)
+    except json.JSONDecodeError as error:
+        return {constants.ERROR: f"invalid json: {error.msg}"}
+    if not isinstance(query, dict):
+        return {constants.ERROR: "query should be a json object"}
+    return query
+
+
+class _BatchAnswerer:
+    """Answer a chunk of queries fetching the bulk lookups at once"""
+
+    def __init__(
+        self,
+        network_repository: repositories.LondonTubeNetworkRepository,
+        queries: list[Query],
+    ):
+        self._network_repository = network_repository
+        self._bulk_results = self._fetch_bulk_results(queries)
+        self._handlers: dict[str, Callable[[Query], Any]] = {
+            constants.BATCH_QUERY_BY_LINE_NAME: self._answer_bulk,
+            constants.BATCH_QUERY_BY_STATION_NAME: self._answer_bulk,
+            constants.BATCH_QUERY_BY_STATION_ID: self._answer_bulk,
+            constants.BATCH_QUERY_JOURNEY: self._answer_journey,
+            constants.BATCH_QUERY_NEAREST_STATIONS: self._answer_nearest,
+            constants.BATCH_QUERY_STATIONS_WITHIN_RADIUS: (
+                self._answer_within_radius
+            ),
+        }
+
+    def _fetch_bulk_results(
+        self, queries: list[Query]
+    ) -> dict[str, dict[str, list]]:
+        keys: dict[str, set[str]] = {name: set() for name in _BULK_QUERY_KEYS}
+        for query in queries:
+            query_name = _get_query_name(query)
+            if query_name not in _BULK_QUERY_KEYS:
+                continue
+            key = query.get(_BULK_QUERY_KEYS[query_name])
+            if isinstance(key, str):
+                keys[query_name].add(key)
+
+        repository = self._network_repository
+        return {
+            constants.BATCH_QUERY_BY_LINE_NAME: (
+                repository.get_stations_by_line_names(
+                    sorted(keys[constants.BATCH_QUERY_BY_LINE_NAME])
+                )
+            ),
+            constants.BATCH_QUERY_BY_STATION_NAME: (
+                repository.get_lines_by_station_names(
+                    sorted(keys[constants.BATCH_QUERY_BY_STATION_NAME])
+                )
+            ),
+            constants.BATCH_QUERY_BY_STATION_ID: (
+                repository.get_lines_by_station_ids(
+                    sorted(keys[constants.BATCH_QUERY_BY_STATION_ID])
+                )
+            ),
+        }
+
+    def _answer_bulk(self, query: Query) -> Any:
+        query_name = query[constants.QUERY]
+        key = _get_field(query, _BULK_QUERY_KEYS[query_name], str)
+        return self._bulk_results[query_name].get(key, [])
+
+    def _answer_journey(self, query: Query) -> Any:
+        from_station_name = _get_field(query, constants.FROM, str)
+        to_station_name = _get_field(query, constants.TO, str)
+        repository = self._network_repository
+        return {
+            "fewest_stops": _journey_to_json(
+                repository.get_fewest_stops_journey(
+                    from_station_name, to_station_name
+                )
+            ),
+            "fewest_interchanges": _journey_to_json(
+                repository.get_fewest_interchanges_journey(
+                    from_station_name, to_station_name
+                )
+            ),
+        }
+
+    def _answer_nearest(self, query: Query) -> Any:
+        return _station_distances_to_json(
+            self._network_repository.get_nearest_stations(
+                _get_field(query, constants.LONGITUDE, float),
+                _get_field(query, constants.LATITUDE, float),
+                _get_field(query, constants.COUNT, int),
+            )
+        )
+
+    def _answer_within_radius(self, query: Query) -> Any:
+        return _station_distances_to_json(
+            self._network_repository.get_stations_within_radius(
+                _get_field(query, constants.LONGITUDE, float),
+                _get_field(query, constants.LATITUDE, float),
+                _get_field(query, constants.RADIUS, float),
+            )
+        )
+
+    def answer(self, query: Query) -> Query:
+        """Return the query with its result or error added"""
+        if constants.ERROR in query:
+            return query
+        handler = self._handlers.get(_get_query_name(query))
+        if handler is None:
+            return {**query, constants.ERROR: "unknown query"}
+        try:
+            return {**query, constants.RESULT: handler(query)}
+        except ValueError as error:
+            # BatchQueryError or invalid values rejected by the lookups
+            return {**query, constants.ERROR: str(error)}
+
+
+def run_batch_queries(
+    network_repository: repositories.LondonTubeNetworkRepository,
+    input_lines: Iterable[str],
+    output_file: TextIO,
+    chunk_size: int = constants.BATCH_QUERIES_CHUNK_SIZE,
+):
+    """Answer json lines queries writing one json line per query
+
+    Results keep the order of the queries and are flushed after every
+    chunk, lookups of a chunk are fetched from the repository at once.
+    """
+    non_empty_lines = (line for line in input_lines if line.strip())
+    for lines in chunked(non_empty_lines, chunk_size):
+        queries = [_parse_query(line) for line in lines]
+        answerer = _BatchAnswerer(network_repository, queries)
+        for query in queries:
+            output_file.write(
+                json.dumps(answerer.answer(query), default=json_default)
+            )
+            output_file.write("\n")
+        output_file.flush()
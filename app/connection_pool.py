@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class PoolClosedError(Exception):
+    pass
+
+
+@dataclass
+class PoolStats:
+    min_connections: int
+    max_connections: int
+    open_connections: int
+    idle_connections: int
+    in_use_connections: int
+    waiting_threads: int
+    checkouts: int
+    timeouts: int
+    discarded_connections: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+
+    @property
+    def average_wait_seconds(self) -> float:
+        return (
+            self.total_wait_seconds / self.checkouts if self.checkouts else 0
+        )
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections"""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_connections: int = 1,
+        max_connections: int = 1,
+        checkout_timeout: Optional[float] = None,
+    ):
+        if max_connections < 1:
+            raise ValueError("max_connections should be at least 1")
+        if not 0 <= min_connections <= max_connections:
+            raise ValueError(
+                "min_connections should be between 0 and max_connections"
+            )
+        self._connect = connect
+        self._min_connections = min_connections
+        self._max_connections = max_connections
+        self._checkout_timeout = checkout_timeout
+        self._condition = threading.Condition()
+        self._idle: deque[Any] = deque()
+        self._open_connections = 0
+        self._in_use_connections = 0
+        self._waiting_threads = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded_connections = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._closed = False
+
+        for _ in range(min_connections):
+            self._idle.append(connect())
+            self._open_connections += 1
+
+    def _acquire(self) -> Any:
+        """Take an idle connection, open a new one or wait for a release"""
+        started_at = time.monotonic()
+        connection = None
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise PoolClosedError("Connection pool is closed")
+                while self._idle:
+                    connection = self._idle.pop()
+                    if not connection.closed:
+                        break
+                    self._open_connections -= 1
+                    self._discarded_connections += 1
+                    connection = None
+                if connection is not None:
+                    break
+                if self._open_connections < self._max_connections:
+                    # reserve the slot, connect outside of the lock
+                    self._open_connections += 1
+                    break
+
+                remaining = None
+                if self._checkout_timeout is not None:
+                    remaining = self._checkout_timeout - (
+                        time.monotonic() - started_at
+                    )
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            "No connection became available in"
+                            f" {self._checkout_timeout} seconds"
+                        )
+                self._waiting_threads += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting_threads -= 1
+
+            wait_seconds = time.monotonic() - started_at
+            self._checkouts += 1
+            self._in_use_connections += 1
+            self._total_wait_seconds += wait_seconds
+            self._max_wait_seconds = max(self._max_wait_seconds, wait_seconds)
+
+        if connection is None:
+            try:
+                connection = self._connect()
+            except BaseException:
+                with self._condition:
+                    self._open_connections -= 1
+                    self._in_use_connections -= 1
+                    self._condition.notify()
+                raise
+        return connection
+
+    def _release(self, connection: Any):
+        with self._condition:
+            self._in_use_connections -= 1
+            if self._closed and not connection.closed:
+                connection.close()
+            if connection.closed:
+                self._open_connections -= 1
+                self._discarded_connections += 1
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Check out a connection for the duration of the block"""
+        connection = self._acquire()
+        try:
+            yield connection
+        finally:
+            self._release(connection)
+
+    def stats(self) -> PoolStats:
+        with self._condition:
+            return PoolStats(
+                min_connections=self._min_connections,
+                max_connections=self._max_connections,
+                open_connections=self._open_connections,
+                idle_connections=len(self._idle),
+                in_use_connections=self._in_use_connections,
+                waiting_threads=self._waiting_threads,
+                checkouts=self._checkouts,
+                timeouts=self._timeouts,
+                discarded_connections=self._discarded_connections,
+                total_wait_seconds=self._total_wait_seconds,
+                max_wait_seconds=self._max_wait_seconds,
+            )
+
+    def close(self):
+        """Close idle connections, checked out ones are closed on release
+
+        Waiting and later checkouts raise PoolClosedError.
+        """
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close()
+                self._open_connections -= 1
+            self._condition.notify_all()
@@ -1,11 +1,52 @@
 # data
 SEED_DATA_FILE_PATH = "data/london_tube_nework.json"
+DISTANCES_CACHE_DIRECTORY = "data/cache"
 STATION_ID_LENGTH = 11
 
+# validation
+VALIDATION_CHUNK_SIZE = 1000  # records validated by a worker at once
+VALIDATION_REPORT_MAX_SAMPLES = 3
+
+# snapshot
+SNAPSHOT_MAGIC = b"LTNS"
+SNAPSHOT_VERSION = 1
+
+# sqlite
+SQLITE_MAX_PARAMETERS = 999
+
+# rows fetched per round trip by Database.select_iter
+SELECT_ITER_SIZE = 2000
+
+# metrics
+HISTOGRAM_MIN_SECONDS = 1e-6
+HISTOGRAM_BUCKETS = 28  # up to about 2 minutes
+METRICS_MAX_SLOW_QUERIES = 50
+
+# query cache
+QUERY_CACHE_MAX_SIZE = 1024
+
+# async database
+ASYNC_PIPELINE_MAX_QUERIES = 500
+
+# name search
+NAME_SUGGESTIONS_LIMIT = 5
+NAME_SEARCH_MIN_SIMILARITY = 0.3
+
+# geospatial
+# bounds of the tube network area, Chesham to Upminster, Morden to Epping
+LONDON_MIN_LONGITUDE = -0.65
+LONDON_MAX_LONGITUDE = 0.35
+LONDON_MIN_LATITUDE = 51.25
+LONDON_MAX_LATITUDE = 51.75
+EARTH_RADIUS_METRES = 6_371_000
+SPATIAL_INDEX_CELL_SIZE = 0.01  # degrees
+SPATIAL_INDEX_INITIAL_RADIUS = 500  # metres
+
 
 STATIONS = "stations"
 LINES = "lines"
 LINE_STATIONS = "line_stations"
+LOAD_MANIFEST = "load_manifest"
 
 # column names
 ID = "id"
@@ -14,6 +55,18 @@ LONGITUDE = "longitude"
 LATITUDE = "latitude"
 STATION_ID = "station_id"
 LINE_ID = "line_id"
+POSITION = "position"
+TABLE_NAME = "table_name"
+SEED_HASH = "seed_hash"
+ROW_COUNT = "row_count"
+IS_COMPLETE = "is_complete"
+# alias of the matched filter value in Database.select_many rows
+FILTER_VALUE = "filter_value"
+
+# index names
+STATIONS_NAME_INDEX = "stations_name_idx"
+LINES_NAME_INDEX = "lines_name_idx"
+LINE_STATIONS_STATION_ID_INDEX = "line_stations_station_id_idx"
 
 # column types
 VARCHAR = "varchar"
@@ -21,6 +74,7 @@ CHAR_11 = "char(11)"
 NUMERIC = "numeric"
 INT = "int"
 SERIAL = "serial"
+BOOLEAN = "boolean"
 
 
 # Queries
@@ -33,7 +87,46 @@ QUERY_BY_STATION_NAME = (
 QUERY_BY_STATION_ID = (
     "Given the station id, return the lines passing through that station"
 )
+QUERY_JOURNEY = (
+    "Given two station names, return the fewest stops"
+    " and the fewest interchanges journeys between them"
+)
+QUERY_NEAREST_STATIONS = (
+    "Given a coordinate, return the nearest stations to it"
+)
+QUERY_STATIONS_WITHIN_RADIUS = (
+    "Given a coordinate and a radius, return stations within the radius"
+)
 QUERY_BY_LINE_NAME_NUMBER = "1"
 QUERY_BY_STATION_NAME_NUMBER = "2"
 QUERY_BY_STATION_ID_NUMBER = "3"
+QUERY_JOURNEY_NUMBER = "4"
+QUERY_NEAREST_STATIONS_NUMBER = "5"
+QUERY_STATIONS_WITHIN_RADIUS_NUMBER = "6"
 EXIT_INPUT = "q"
+
+# http server
+HTTP_DEFAULT_HOST = "127.0.0.1"
+HTTP_DEFAULT_WORKERS = 8
+HTTP_KEEP_ALIVE_TIMEOUT = 5  # seconds an idle connection holds a worker
+HTTP_CACHE_MAX_AGE = 60  # seconds
+HTTP_LINES_PATH = "/lines"
+HTTP_STATIONS_PATH = "/stations"
+STATION_NAME = "station_name"
+LINE_NAME = "line_name"
+
+# batch queries, one json object a line with the query name under QUERY
+BATCH_QUERIES_CHUNK_SIZE = 500  # queries answered with one bulk fetch
+QUERY = "query"
+FROM = "from"
+TO = "to"
+COUNT = "count"
+RADIUS = "radius"
+RESULT = "result"
+ERROR = "error"
+BATCH_QUERY_BY_LINE_NAME = "stations_by_line_name"
+BATCH_QUERY_BY_STATION_NAME = "lines_by_station_name"
+BATCH_QUERY_BY_STATION_ID = "lines_by_station_id"
+BATCH_QUERY_JOURNEY = "journey"
+BATCH_QUERY_NEAREST_STATIONS = "nearest_stations"
+BATCH_QUERY_STATIONS_WITHIN_RADIUS = "stations_within_radius"
@@ -1,4 +1,4 @@
-from typing import NamedTuple
+from typing import Any, NamedTuple, Optional
 
 
 class Column(NamedTuple):
@@ -8,3 +8,38 @@ class Column(NamedTuple):
     is_foreign_key: bool = False
     foreign_key_table: str = ""
     foreign_key_column: str = ""
+
+
+class Index(NamedTuple):
+    """Secondary index over columns or over a raw SQL expression"""
+
+    name: str
+    columns: tuple[str, ...] = ()
+    expression: str = ""
+    is_unique: bool = False
+
+
+class LineStations(NamedTuple):
+    name: str
+    station_ids: list[str]
+
+
+class LoadManifestEntry(NamedTuple):
+    """Progress of loading the seed file into one table"""
+
+    table: str
+    seed_hash: str
+    row_count: int
+    is_complete: bool
+
+
+class SelectQuery(NamedTuple):
+    """Arguments of Database.select in the order of its parameters"""
+
+    table: str
+    columns: list[str]
+    join_tables: Optional[list[str]] = None
+    left_ons: Optional[list[str]] = None
+    right_ons: Optional[list[str]] = None
+    filter_colummn: Optional[str] = None
+    filter_value: Optional[Any] = None
@@ -1,25 +1,112 @@
 from __future__ import annotations
 
-from typing import Any, Optional, Sequence, cast
+import csv
+import io
+import itertools
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Hashable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    cast,
+)
 
 import psycopg2
-from psycopg2 import extras, sql
+from psycopg2 import extensions, extras, sql
 
-from app.abstractions import Database
-from app.custom_types import Column
+from app import constants
+from app.abstractions import Database, instrumented
+from app.connection_pool import ConnectionPool, PoolStats
+from app.custom_types import Column, Index
+from app.query_builders import compose_select, describe_select
+from app.query_events import QueryEvent
+from app.utils import chunked
+
+
+class _PreparingConnection(extensions.connection):
+    """Connection remembering statements prepared in its session"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: set[str] = set()
+
+
+class _SelectStatement(NamedTuple):
+    name: str
+    prepare_query: str
+    execute_query: str
 
 
 class PostgreDB(Database):
     def __init__(
-        self, database: str, user: str, password: str, host: str, port: str
+        self,
+        database: str,
+        user: str,
+        password: str,
+        host: str,
+        port: str,
+        min_connections: int = 1,
+        max_connections: int = 1,
+        checkout_timeout: Optional[float] = None,
+        use_prepared_statements: bool = True,
+        slow_query_threshold: Optional[float] = None,
     ):
-        self._connection = psycopg2.connect(
-            database=database,
-            user=user,
-            password=password,
-            host=host,
-            port=port,
+        super().__init__(slow_query_threshold)
+        self._pool = ConnectionPool(
+            connect=lambda: psycopg2.connect(
+                database=database,
+                user=user,
+                password=password,
+                host=host,
+                port=port,
+                connection_factory=_PreparingConnection,
+            ),
+            min_connections=min_connections,
+            max_connections=max_connections,
+            checkout_timeout=checkout_timeout,
         )
+        # connection of the transaction running in the current thread
+        self._local = threading.local()
+        self._use_prepared_statements = use_prepared_statements
+        self._select_statements: dict[Hashable, _SelectStatement] = {}
+        self._select_statements_lock = threading.Lock()
+        self._cursor_names = itertools.count()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Run the enclosed calls of this thread in a single transaction"""
+        if getattr(self._local, "connection", None) is not None:
+            yield
+            return
+
+        with self._instrument("transaction") as event, event.phase(
+            "execute"
+        ), self._pool.connection() as connection, connection:
+            self._local.connection = connection
+            try:
+                yield
+            finally:
+                self._local.connection = None
+
+    @contextmanager
+    def _cursor(self, cursor_factory=None) -> Iterator[Any]:
+        """Open cursor inside the current or a new transaction"""
+        with self.transaction(), self._local.connection.cursor(
+            cursor_factory=cursor_factory
+        ) as cursor:
+            yield cursor
+
+    def pool_stats(self) -> PoolStats:
+        return self._pool.stats()
+
+    def close(self):
+        self._pool.close()
 
     def _create_column_definition_string(self, column: Column) -> sql.Composed:
         """Create column definition to use them in order to create a table"""
@@ -33,18 +120,42 @@ class PostgreDB(Database):
             column_definition += sql.SQL(
                 " REFERENCES {table}({column})"
             ).format(
-                sql.Identifier(column.foreign_key_table),
-                sql.Identifier(column.foreign_key_column),
+                table=sql.Identifier(column.foreign_key_table),
+                column=sql.Identifier(column.foreign_key_column),
             )
         return column_definition
 
-    def _to_valid_identifier(self, value: str):
-        return sql.SQL(".").join(
-            [sql.Identifier(component) for component in value.split(".")]
+    def _create_index_query(self, table: str, index: Index) -> sql.Composed:
+        """Create index definition over columns or an expression"""
+        if index.expression:
+            indexed = sql.SQL("({expression})").format(
+                expression=sql.SQL(index.expression)
+            )
+        else:
+            indexed = sql.SQL(",").join(
+                [sql.Identifier(column) for column in index.columns]
+            )
+        return sql.SQL(
+            "CREATE {unique}INDEX IF NOT EXISTS {name} ON {table} ({indexed});"
+        ).format(
+            unique=sql.SQL("UNIQUE " if index.is_unique else ""),
+            name=sql.Identifier(index.name),
+            table=sql.Identifier(table),
+            indexed=indexed,
         )
 
-    def create_table(self, table: str, columns: list[Column]):
-        """Create table in the database"""
+    @instrumented
+    def create_table(
+        self,
+        table: str,
+        columns: list[Column],
+        indexes: Optional[list[Index]] = None,
+    ):
+        """Create table and its secondary indexes in the database
+
+        Columns missing from a table created by an older version are
+        added, primary key columns cannot be and are left out.
+        """
         primary_key = sql.SQL("PRIMARY KEY ({columns})").format(
             columns=sql.SQL(",").join(
                 [
@@ -66,9 +177,33 @@ class PostgreDB(Database):
                 + [primary_key]
             ),
         )
-        with self._connection, self._connection.cursor() as cursor:
+        with self._cursor() as cursor:
             cursor.execute(query)
+            self._add_missing_columns(cursor, table, columns)
+            for index in indexes or []:
+                cursor.execute(self._create_index_query(table, index))
 
+    def _add_missing_columns(
+        self, cursor: Any, table: str, columns: list[Column]
+    ):
+        """Add columns introduced after the table was created"""
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns"
+            " WHERE table_schema = current_schema() AND table_name = %s",
+            (table,),
+        )
+        existing_columns = {row[0] for row in cursor.fetchall()}
+        for column in columns:
+            if column.name in existing_columns or column.is_primary_key:
+                continue
+            cursor.execute(
+                sql.SQL("ALTER TABLE {table} ADD COLUMN {column}").format(
+                    table=sql.Identifier(table),
+                    column=self._create_column_definition_string(column),
+                )
+            )
+
+    @instrumented
     def insert_batch(
         self,
         table: str,
@@ -86,9 +221,43 @@ class PostgreDB(Database):
             ),
             values=placeholders,
         )
-        with self._connection, self._connection.cursor() as cursor:
+        with self._cursor() as cursor:
             extras.execute_batch(cursor, query, values)
 
+    @instrumented
+    def copy_batch(
+        self,
+        table: str,
+        columns: list[str],
+        values: Iterable[tuple[Any, ...]],
+    ):
+        """Stream rows into the table with a single COPY FROM STDIN"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(values)
+        buffer.seek(0)
+        query = sql.SQL(
+            "COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)"
+        ).format(
+            table=sql.Identifier(table),
+            columns=sql.SQL(",").join(
+                [sql.Identifier(column) for column in columns]
+            ),
+        )
+        with self._cursor() as cursor:
+            cursor.copy_expert(query.as_string(cursor), buffer)
+
+    @instrumented
+    def reserve_ids(self, table: str, column: str, count: int) -> list[int]:
+        """Take count values of the serial column sequence at once"""
+        query = sql.SQL(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s))"
+            " FROM generate_series(1, %s)"
+        )
+        with self._cursor() as cursor:
+            cursor.execute(query, (table, column, count))
+            return [row[0] for row in cursor.fetchall()]
+
+    @instrumented
     def insert(
         self,
         table: str,
@@ -112,23 +281,83 @@ class PostgreDB(Database):
             query += sql.SQL(" RETURNING {return_column}").format(
                 return_column=sql.Identifier(return_column)
             )
-        with self._connection, self._connection.cursor() as cursor:
+        with self._cursor() as cursor:
             cursor.execute(query, value)
             if return_column:
                 result = cast(tuple, cursor.fetchone())[0]
 
         return result
 
+    @instrumented
+    def upsert(
+        self,
+        table: str,
+        columns: list[str],
+        values: Sequence[tuple[Any, ...]],
+        conflict_columns: list[str],
+    ):
+        """Insert rows updating the existing ones on conflict"""
+        placeholders = sql.SQL(",").join(sql.Placeholder() * len(columns))
+        query = sql.SQL(
+            "INSERT INTO {table} ({columns}) VALUES ({values})"
+            " ON CONFLICT ({conflict_columns}) DO UPDATE SET {updates}"
+        ).format(
+            table=sql.Identifier(table),
+            columns=sql.SQL(",").join(
+                [sql.Identifier(column) for column in columns]
+            ),
+            values=placeholders,
+            conflict_columns=sql.SQL(",").join(
+                [sql.Identifier(column) for column in conflict_columns]
+            ),
+            updates=sql.SQL(",").join(
+                [
+                    sql.SQL("{column} = EXCLUDED.{column}").format(
+                        column=sql.Identifier(column)
+                    )
+                    for column in columns
+                    if column not in conflict_columns
+                ]
+            ),
+        )
+        with self._cursor() as cursor:
+            extras.execute_batch(cursor, query, values)
+
+    @instrumented
+    def delete(
+        self,
+        table: str,
+        filter_columns: list[str],
+        values: Sequence[tuple[Any, ...]],
+    ):
+        """Delete rows matching the filter columns with any of values"""
+        query = sql.SQL("DELETE FROM {table} WHERE {conditions}").format(
+            table=sql.Identifier(table),
+            conditions=sql.SQL(" AND ").join(
+                [
+                    sql.SQL("{column} = %s").format(
+                        column=sql.Identifier(column)
+                    )
+                    for column in filter_columns
+                ]
+            ),
+        )
+        with self._cursor() as cursor:
+            extras.execute_batch(cursor, query, values)
+
+    @instrumented
     def data_exists(self, table: str) -> bool:
-        """Check whether there is data in the {table}"""
-        query = sql.SQL("SELECT COUNT(*) FROM {table};").format(
+        """Check whether there is data in the {table}
+
+        EXISTS stops at the first row instead of counting the table
+        """
+        query = sql.SQL("SELECT EXISTS (SELECT 1 FROM {table});").format(
             table=sql.Identifier(table)
         )
-        with self._connection, self._connection.cursor() as cursor:
+        with self._cursor() as cursor:
             cursor.execute(query)
             result = cursor.fetchone()
-            count = cast(tuple, result)[0]
-            return count > 0
+            return cast(tuple, result)[0]
 
     def select(
         self,
@@ -141,39 +370,728 @@ class PostgreDB(Database):
         filter_value: Optional[Any] = None,
     ) -> list[dict[str, Any]]:
         """select rows from table optionally join multiple tables"""
-        query = sql.SQL("SELECT {columns} FROM {table}").format(
-            columns=sql.SQL(",").join(
-                [self._to_valid_identifier(column) for column in columns]
-            ),
-            table=self._to_valid_identifier(table),
+        if not filter_value:
+            filter_colummn = None
+        return self._run_select(
+            table,
+            columns,
+            join_tables,
+            left_ons,
+            right_ons,
+            filter_colummn,
+            filter_value,
         )
 
-        if join_tables and left_ons and right_ons:
-            query += sql.SQL(" ") + sql.SQL(" ").join(
-                [
-                    sql.SQL("JOIN {table} ON {left_on} = {right_on}").format(
-                        table=self._to_valid_identifier(join_table),
-                        left_on=self._to_valid_identifier(left_on),
-                        right_on=self._to_valid_identifier(right_on),
+    def select_tuples(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]] = None,
+        left_ons: Optional[list[str]] = None,
+        right_ons: Optional[list[str]] = None,
+        filter_colummn: Optional[str] = None,
+        filter_value: Optional[Any] = None,
+    ) -> list[tuple[Any, ...]]:
+        """select like select but return plain tuples in columns order
+
+        Skips DictCursor, which builds a dict-like row per result.
+        """
+        if not filter_value:
+            filter_colummn = None
+        return self._run_select(
+            table,
+            columns,
+            join_tables,
+            left_ons,
+            right_ons,
+            filter_colummn,
+            filter_value,
+            method="select_tuples",
+            cursor_factory=None,
+        )
+
+    def select_iter(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]] = None,
+        left_ons: Optional[list[str]] = None,
+        right_ons: Optional[list[str]] = None,
+        filter_colummn: Optional[str] = None,
+        filter_value: Optional[Any] = None,
+        itersize: int = constants.SELECT_ITER_SIZE,
+    ) -> Iterator[tuple[Any, ...]]:
+        """Stream rows as tuples from a named server-side cursor
+
+        Only itersize rows are held in memory at a time. The cursor
+        lives in the transaction of this thread until the iterator is
+        exhausted or closed, calls made in between join the transaction.
+        """
+        if not filter_value:
+            filter_colummn = None
+        query = compose_select(
+            sql,
+            table=table,
+            columns=columns,
+            join_tables=join_tables,
+            left_ons=left_ons,
+            right_ons=right_ons,
+            filter_colummn=filter_colummn,
+        )
+        cursor_name = f"select_iter_{next(self._cursor_names)}"
+        shape = describe_select(table, join_tables, filter_colummn)
+        with self._instrument(
+            "select_iter", shape
+        ) as event, self.transaction(), self._local.connection.cursor(
+            name=cursor_name
+        ) as cursor:
+            with event.phase("execute"):
+                if filter_colummn:
+                    cursor.execute(query, (filter_value,))
+                else:
+                    cursor.execute(query)
+            # only fetches are timed, not the consumer between them
+            while True:
+                with event.phase("fetch"):
+                    rows = cursor.fetchmany(itersize)
+                if not rows:
+                    break
+                event.row_count += len(rows)
+                yield from rows
+
+    def select_many(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]] = None,
+        left_ons: Optional[list[str]] = None,
+        right_ons: Optional[list[str]] = None,
+        filter_colummn: Optional[str] = None,
+        filter_values: Sequence[Any] = (),
+    ) -> list[dict[str, Any]]:
+        """select rows matching any of the values in a single query
+
+        Every row carries its matched value under FILTER_VALUE.
+        """
+        if not filter_colummn or not filter_values:
+            return []
+        return self._run_select(
+            table,
+            columns,
+            join_tables,
+            left_ons,
+            right_ons,
+            filter_colummn,
+            list(filter_values),
+            method="select_many",
+            match_any=True,
+        )
+
+    def _run_select(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]],
+        left_ons: Optional[list[str]],
+        right_ons: Optional[list[str]],
+        filter_colummn: Optional[str],
+        filter_value: Optional[Any],
+        method: str = "select",
+        match_any: bool = False,
+        cursor_factory: Any = extras.DictCursor,
+    ) -> list[Any]:
+        shape = describe_select(table, join_tables, filter_colummn, match_any)
+        with self._instrument(method, shape) as event, self._cursor(
+            cursor_factory=cursor_factory
+        ) as cursor:
+            with event.phase("compose"):
+                if self._use_prepared_statements:
+                    statement = self._get_select_statement(
+                        cursor,
+                        table,
+                        columns,
+                        join_tables,
+                        left_ons,
+                        right_ons,
+                        filter_colummn,
+                        match_any,
                     )
-                    for join_table, left_on, right_on in zip(
-                        join_tables, left_ons, right_ons
+                    prepared = cursor.connection.prepared_statements
+                    if statement.name not in prepared:
+                        cursor.execute(statement.prepare_query)
+                        prepared.add(statement.name)
+                    query = statement.execute_query
+                else:
+                    query = compose_select(
+                        sql,
+                        table=table,
+                        columns=columns,
+                        join_tables=join_tables,
+                        left_ons=left_ons,
+                        right_ons=right_ons,
+                        filter_colummn=filter_colummn,
+                        match_any=match_any,
                     )
+
+            with event.phase("execute"):
+                if filter_colummn:
+                    cursor.execute(query, (filter_value,))
+                else:
+                    cursor.execute(query)
+            with event.phase("fetch"):
+                rows = cursor.fetchall()
+            event.row_count = len(rows)
+
+            if self._is_slow(event):
+                self._explain(cursor, event)
+            return rows
+
+    def _explain(self, cursor: Any, event: QueryEvent):
+        """Capture the plan of the query the cursor has just run
+
+        EXPLAIN ANALYZE runs the query again, so only selects are
+        explained, EXECUTE of a prepared statement is explained as well.
+        """
+        event.query = cursor.query.decode()
+        cursor.execute(b"EXPLAIN (ANALYZE, BUFFERS) " + cursor.query)
+        event.plan = "\n".join(row[0] for row in cursor.fetchall())
+
+    def _get_select_statement(
+        self,
+        cursor: Any,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]],
+        left_ons: Optional[list[str]],
+        right_ons: Optional[list[str]],
+        filter_colummn: Optional[str],
+        match_any: bool,
+    ) -> _SelectStatement:
+        """Return the memoized statement of the select query shape"""
+        shape = (
+            table,
+            tuple(columns),
+            tuple(join_tables or ()),
+            tuple(left_ons or ()),
+            tuple(right_ons or ()),
+            filter_colummn,
+            match_any,
+        )
+        statement = self._select_statements.get(shape)
+        if statement is not None:
+            return statement
+
+        with self._select_statements_lock:
+            statement = self._select_statements.get(shape)
+            if statement is None:
+                name = sql.Identifier(f"select_{len(self._select_statements)}")
+                query = compose_select(
+                    sql,
+                    table=table,
+                    columns=columns,
+                    join_tables=join_tables,
+                    left_ons=left_ons,
+                    right_ons=right_ons,
+                    filter_colummn=filter_colummn,
+                    placeholder="$1",
+                    match_any=match_any,
+                )
+                execute_query = (
+                    sql.SQL("EXECUTE {name}(%s)")
+                    if filter_colummn
+                    else sql.SQL("EXECUTE {name}")
+                )
+                statement = _SelectStatement(
+                    name=name.string,
+                    prepare_query=(
+                        sql.SQL("PREPARE {name} AS ").format(name=name) + query
+                    ).as_string(cursor),
+                    execute_query=execute_query.format(name=name).as_string(
+                        cursor
+                    ),
+                )
+                self._select_statements[shape] = statement
+            return statement
+
+
+class SQLiteDB(Database):
+    """Embedded database stored in a file or in memory (":memory:")"""
+
+    # column types of the schema that SQLite spells differently
+    _DATA_TYPES = {constants.SERIAL: "integer"}
+
+    def __init__(
+        self, database: str, slow_query_threshold: Optional[float] = None
+    ):
+        super().__init__(slow_query_threshold)
+        self._connection = sqlite3.connect(database, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        # sqlite3 connection is shared by threads one transaction at a time
+        self._lock = threading.RLock()
+        self._transaction_depth = 0
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Run the enclosed calls in a single transaction"""
+        with self._lock:
+            if self._transaction_depth:
+                self._transaction_depth += 1
+                try:
+                    yield
+                finally:
+                    self._transaction_depth -= 1
+                return
+
+            with self._instrument("transaction") as event, event.phase(
+                "execute"
+            ), self._connection:
+                self._transaction_depth = 1
+                try:
+                    yield
+                finally:
+                    self._transaction_depth = 0
+
+    @contextmanager
+    def _cursor(self) -> Iterator[sqlite3.Cursor]:
+        """Open cursor inside the current or a new transaction"""
+        with self.transaction():
+            cursor = self._connection.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def close(self):
+        self._connection.close()
+
+    def _to_valid_identifier(self, value: str) -> str:
+        return ".".join(
+            '"{}"'.format(component.replace('"', '""'))
+            for component in value.split(".")
+        )
+
+    def _create_column_definition_string(self, column: Column) -> str:
+        """Create column definition to use them in order to create a table"""
+        column_definition = (
+            f"{self._to_valid_identifier(column.name)}"
+            f" {self._DATA_TYPES.get(column.data_type, column.data_type)}"
+        )
+        if column.is_foreign_key:
+            column_definition += (
+                " REFERENCES"
+                f" {self._to_valid_identifier(column.foreign_key_table)}"
+                f"({self._to_valid_identifier(column.foreign_key_column)})"
+            )
+        return column_definition
+
+    def _create_index_query(self, table: str, index: Index) -> str:
+        """Create index definition over columns or an expression"""
+        if index.expression:
+            indexed = f"({index.expression})"
+        else:
+            indexed = ",".join(
+                self._to_valid_identifier(column) for column in index.columns
+            )
+        return (
+            f"CREATE {'UNIQUE ' if index.is_unique else ''}INDEX IF NOT EXISTS"
+            f" {self._to_valid_identifier(index.name)}"
+            f" ON {self._to_valid_identifier(table)} ({indexed});"
+        )
+
+    @instrumented
+    def create_table(
+        self,
+        table: str,
+        columns: list[Column],
+        indexes: Optional[list[Index]] = None,
+    ):
+        """Create table and its secondary indexes in the database
+
+        Columns missing from a table created by an older version are
+        added, primary key columns cannot be and are left out.
+        """
+        primary_key = "PRIMARY KEY ({columns})".format(
+            columns=",".join(
+                self._to_valid_identifier(column.name)
+                for column in columns
+                if column.is_primary_key
+            )
+        )
+        query = "CREATE TABLE IF NOT EXISTS {table} ({columns});".format(
+            table=self._to_valid_identifier(table),
+            columns=",".join(
+                [
+                    self._create_column_definition_string(column)
+                    for column in columns
                 ]
+                + [primary_key]
+            ),
+        )
+        with self._cursor() as cursor:
+            cursor.execute(query)
+            self._add_missing_columns(cursor, table, columns)
+            for index in indexes or []:
+                cursor.execute(self._create_index_query(table, index))
+
+    def _add_missing_columns(
+        self, cursor: sqlite3.Cursor, table: str, columns: list[Column]
+    ):
+        """Add columns introduced after the table was created"""
+        cursor.execute(
+            f"PRAGMA table_info({self._to_valid_identifier(table)})"
+        )
+        existing_columns = {row[1] for row in cursor.fetchall()}
+        for column in columns:
+            if column.name in existing_columns or column.is_primary_key:
+                continue
+            cursor.execute(
+                f"ALTER TABLE {self._to_valid_identifier(table)}"
+                f" ADD COLUMN {self._create_column_definition_string(column)}"
+            )
+
+    def _insert_query(self, table: str, columns: list[str]) -> str:
+        return "INSERT INTO {table} ({columns}) VALUES ({values})".format(
+            table=self._to_valid_identifier(table),
+            columns=",".join(
+                self._to_valid_identifier(column) for column in columns
+            ),
+            values=",".join("?" * len(columns)),
+        )
+
+    @instrumented
+    def insert_batch(
+        self,
+        table: str,
+        columns: list[str],
+        values: Sequence[tuple[Any, ...]],
+    ):
+        """Insert data with batches in order to reduce roundtrips"""
+        with self._cursor() as cursor:
+            cursor.executemany(self._insert_query(table, columns), values)
+
+    @instrumented
+    def copy_batch(
+        self,
+        table: str,
+        columns: list[str],
+        values: Iterable[tuple[Any, ...]],
+    ):
+        """Insert rows with executemany, SQLite has no COPY"""
+        with self._cursor() as cursor:
+            cursor.executemany(self._insert_query(table, columns), values)
+
+    @instrumented
+    def reserve_ids(self, table: str, column: str, count: int) -> list[int]:
+        """Reserve ids after the current maximum of the integer column"""
+        query = "SELECT COALESCE(MAX({column}), 0) FROM {table}".format(
+            column=self._to_valid_identifier(column),
+            table=self._to_valid_identifier(table),
+        )
+        with self._cursor() as cursor:
+            cursor.execute(query)
+            last_id = cursor.fetchone()[0]
+        return list(range(last_id + 1, last_id + count + 1))
+
+    @instrumented
+    def insert(
+        self,
+        table: str,
+        columns: list[str],
+        value: tuple[Any, ...],
+        return_column: Optional[str] = None,
+    ) -> Any:
+        """Insert row into table and optionally return any value"""
+        query = self._insert_query(table, columns)
+        if return_column:
+            query += f" RETURNING {self._to_valid_identifier(return_column)}"
+        with self._cursor() as cursor:
+            cursor.execute(query, value)
+            if return_column:
+                return cursor.fetchone()[0]
+        return None
+
+    @instrumented
+    def upsert(
+        self,
+        table: str,
+        columns: list[str],
+        values: Sequence[tuple[Any, ...]],
+        conflict_columns: list[str],
+    ):
+        """Insert rows updating the existing ones on conflict"""
+        query = (
+            "{insert} ON CONFLICT ({conflict_columns}) DO UPDATE SET {updates}"
+        )
+        query = query.format(
+            insert=self._insert_query(table, columns),
+            conflict_columns=",".join(
+                self._to_valid_identifier(column)
+                for column in conflict_columns
+            ),
+            updates=",".join(
+                "{column} = excluded.{column}".format(
+                    column=self._to_valid_identifier(column)
+                )
+                for column in columns
+                if column not in conflict_columns
+            ),
+        )
+        with self._cursor() as cursor:
+            cursor.executemany(query, values)
+
+    @instrumented
+    def delete(
+        self,
+        table: str,
+        filter_columns: list[str],
+        values: Sequence[tuple[Any, ...]],
+    ):
+        """Delete rows matching the filter columns with any of values"""
+        query = "DELETE FROM {table} WHERE {conditions}".format(
+            table=self._to_valid_identifier(table),
+            conditions=" AND ".join(
+                f"{self._to_valid_identifier(column)} = ?"
+                for column in filter_columns
+            ),
+        )
+        with self._cursor() as cursor:
+            cursor.executemany(query, values)
+
+    @instrumented
+    def data_exists(self, table: str) -> bool:
+        """Check whether there is data in the {table}"""
+        query = "SELECT EXISTS (SELECT 1 FROM {table});".format(
+            table=self._to_valid_identifier(table)
+        )
+        with self._cursor() as cursor:
+            cursor.execute(query)
+            return bool(cursor.fetchone()[0])
+
+    def _compose_select(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]],
+        left_ons: Optional[list[str]],
+        right_ons: Optional[list[str]],
+        filter_colummn: Optional[str],
+        values_count: Optional[int] = None,
+    ) -> str:
+        """Compose select, values_count switches the filter to IN (...)"""
+        selected = [self._to_valid_identifier(column) for column in columns]
+        if values_count is not None and filter_colummn:
+            selected.insert(
+                0,
+                f"{self._to_valid_identifier(filter_colummn)}"
+                f" AS {self._to_valid_identifier(constants.FILTER_VALUE)}",
             )
+        query = (
+            f"SELECT {','.join(selected)}"
+            f" FROM {self._to_valid_identifier(table)}"
+        )
 
-        if filter_colummn and filter_value:
-            query += sql.SQL(" ") + sql.SQL("WHERE {column} = %s").format(
-                column=self._to_valid_identifier(filter_colummn)
+        if join_tables and left_ons and right_ons:
+            query += " " + " ".join(
+                f"JOIN {self._to_valid_identifier(join_table)}"
+                f" ON {self._to_valid_identifier(left_on)}"
+                f" = {self._to_valid_identifier(right_on)}"
+                for join_table, left_on, right_on in zip(
+                    join_tables, left_ons, right_ons
+                )
             )
 
-        with self._connection, self._connection.cursor(
-            cursor_factory=extras.DictCursor
-        ) as cursor:
-            if filter_value:
-                cursor.execute(query, (filter_value,))
+        if filter_colummn:
+            column = self._to_valid_identifier(filter_colummn)
+            if values_count is None:
+                query += f" WHERE {column} = ?"
             else:
-                cursor.execute(query)
+                query += f" WHERE {column} IN ({','.join('?' * values_count)})"
+        return query
+
+    def select(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]] = None,
+        left_ons: Optional[list[str]] = None,
+        right_ons: Optional[list[str]] = None,
+        filter_colummn: Optional[str] = None,
+        filter_value: Optional[Any] = None,
+    ) -> list[dict[str, Any]]:
+        """select rows from table optionally join multiple tables"""
+        rows = self._fetch_select(
+            table,
+            columns,
+            join_tables,
+            left_ons,
+            right_ons,
+            filter_colummn,
+            filter_value,
+        )
+        return [dict(row) for row in rows]
+
+    def select_tuples(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]] = None,
+        left_ons: Optional[list[str]] = None,
+        right_ons: Optional[list[str]] = None,
+        filter_colummn: Optional[str] = None,
+        filter_value: Optional[Any] = None,
+    ) -> list[tuple[Any, ...]]:
+        """select like select but return plain tuples in columns order"""
+        rows = self._fetch_select(
+            table,
+            columns,
+            join_tables,
+            left_ons,
+            right_ons,
+            filter_colummn,
+            filter_value,
+            method="select_tuples",
+        )
+        return [tuple(row) for row in rows]
+
+    def _fetch_select(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]],
+        left_ons: Optional[list[str]],
+        right_ons: Optional[list[str]],
+        filter_colummn: Optional[str],
+        filter_value: Optional[Any],
+        method: str = "select",
+    ) -> list[sqlite3.Row]:
+        if not filter_value:
+            filter_colummn = None
+        shape = describe_select(table, join_tables, filter_colummn)
+        with self._instrument(
+            method, shape
+        ) as event, self._cursor() as cursor:
+            with event.phase("compose"):
+                query = self._compose_select(
+                    table,
+                    columns,
+                    join_tables,
+                    left_ons,
+                    right_ons,
+                    filter_colummn,
+                )
+            parameters = (filter_value,) if filter_colummn else ()
+            with event.phase("execute"):
+                cursor.execute(query, parameters)
+            with event.phase("fetch"):
+                rows = cursor.fetchall()
+            event.row_count = len(rows)
 
-            rows = cast(list[dict[str, Any]], cursor.fetchall())
+            if self._is_slow(event):
+                self._explain(cursor, event, query, parameters)
             return rows
+
+    def _explain(
+        self,
+        cursor: sqlite3.Cursor,
+        event: QueryEvent,
+        query: str,
+        parameters: Sequence[Any],
+    ):
+        """Capture the plan of the query, SQLite cannot EXPLAIN ANALYZE"""
+        event.query = query
+        cursor.execute(f"EXPLAIN QUERY PLAN {query}", parameters)
+        event.plan = "\n".join(row[3] for row in cursor.fetchall())
+
+    def select_iter(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]] = None,
+        left_ons: Optional[list[str]] = None,
+        right_ons: Optional[list[str]] = None,
+        filter_colummn: Optional[str] = None,
+        filter_value: Optional[Any] = None,
+        itersize: int = constants.SELECT_ITER_SIZE,
+    ) -> Iterator[tuple[Any, ...]]:
+        """Stream rows as tuples fetching itersize rows at a time
+
+        The connection lock is taken for every fetch and released while
+        the consumer handles the rows, so other threads are not blocked
+        by a slow consumer. Unless the call is made in a transaction,
+        rows written by other threads between fetches may be streamed.
+        """
+        if not filter_value:
+            filter_colummn = None
+        query = self._compose_select(
+            table, columns, join_tables, left_ons, right_ons, filter_colummn
+        )
+        shape = describe_select(table, join_tables, filter_colummn)
+        with self._instrument("select_iter", shape) as event:
+            with self._lock:
+                cursor = self._connection.cursor()
+            try:
+                with self._lock, event.phase("execute"):
+                    if filter_colummn:
+                        cursor.execute(query, (filter_value,))
+                    else:
+                        cursor.execute(query)
+                # only fetches are timed, not the consumer between them
+                while True:
+                    with self._lock, event.phase("fetch"):
+                        rows = cursor.fetchmany(itersize)
+                    if not rows:
+                        break
+                    event.row_count += len(rows)
+                    yield from map(tuple, rows)
+            finally:
+                with self._lock:
+                    cursor.close()
+
+    def select_many(
+        self,
+        table: str,
+        columns: list[str],
+        join_tables: Optional[list[str]] = None,
+        left_ons: Optional[list[str]] = None,
+        right_ons: Optional[list[str]] = None,
+        filter_colummn: Optional[str] = None,
+        filter_values: Sequence[Any] = (),
+    ) -> list[dict[str, Any]]:
+        """select rows matching any of the values in a single query
+
+        Every row carries its matched value under FILTER_VALUE.
+        """
+        if not filter_colummn or not filter_values:
+            return []
+        rows: list[dict[str, Any]] = []
+        shape = describe_select(
+            table, join_tables, filter_colummn, match_any=True
+        )
+        with self._instrument(
+            "select_many", shape
+        ) as event, self._cursor() as cursor:
+            # stay under the limit of query parameters of SQLite
+            for values in chunked(
+                filter_values, constants.SQLITE_MAX_PARAMETERS
+            ):
+                with event.phase("compose"):
+                    query = self._compose_select(
+                        table,
+                        columns,
+                        join_tables,
+                        left_ons,
+                        right_ons,
+                        filter_colummn,
+                        values_count=len(values),
+                    )
+                with event.phase("execute"):
+                    cursor.execute(query, values)
+                with event.phase("fetch"):
+                    rows.extend(dict(row) for row in cursor.fetchall())
+            event.row_count = len(rows)
+
+            if self._is_slow(event):
+                # the plan of the last chunk stands for all of them
+                self._explain(cursor, event, query, values)
+        return rows
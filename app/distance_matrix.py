@@ -0,0 +1,163 @@
+import hashlib
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.graph import NetworkGraph
+from app.utils import file_sha256
+
+UNREACHABLE = -1
+HOPS = 0
+INTERCHANGES = 1
+
+
+class DistanceMatrix:
+    """All-pairs hop and interchange counts indexed by station"""
+
+    def __init__(self, station_ids: Sequence[str], distances: np.ndarray):
+        self._station_indexes = {
+            station_id: index for index, station_id in enumerate(station_ids)
+        }
+        self._distances = distances
+
+    def _get(self, kind: int, from_id: str, to_id: str) -> Optional[int]:
+        from_index = self._station_indexes.get(from_id)
+        to_index = self._station_indexes.get(to_id)
+        if from_index is None or to_index is None:
+            return None
+        distance = int(self._distances[kind, from_index, to_index])
+        return None if distance == UNREACHABLE else distance
+
+    def get_hops(self, from_id: str, to_id: str) -> Optional[int]:
+        return self._get(HOPS, from_id, to_id)
+
+    def get_interchanges(self, from_id: str, to_id: str) -> Optional[int]:
+        return self._get(INTERCHANGES, from_id, to_id)
+
+
+def _breadth_first_levels(step: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """Run BFS from every station at once using boolean matrix products
+
+    Row i of the result holds the level at which every station was first
+    reached from station i, or UNREACHABLE.
+    """
+    step_matrix = step.astype(np.float32)
+    levels = np.full(start.shape, UNREACHABLE, dtype=np.int16)
+    levels[start] = 0
+    reached = start.copy()
+    frontier = start
+    level = 0
+    while frontier.any():
+        level += 1
+        frontier = ((frontier.astype(np.float32) @ step_matrix) > 0) & ~reached
+        levels[frontier] = level
+        reached |= frontier
+    return levels
+
+
+def build_distances(graph: NetworkGraph) -> tuple[list[str], np.ndarray]:
+    """Build the (2, n, n) int16 hops/interchanges matrix of the graph"""
+    station_ids = [station.id for station in graph.stations]
+    station_indexes = {
+        station_id: index for index, station_id in enumerate(station_ids)
+    }
+    line_indexes = {line.id: index for index, line in enumerate(graph.lines)}
+    station_count = len(station_ids)
+
+    adjacency = np.zeros((station_count, station_count), dtype=bool)
+    incidence = np.zeros((station_count, len(line_indexes)), dtype=bool)
+    for station_id, station_index in station_indexes.items():
+        for neighbour_id, _ in graph.get_neighbours(station_id):
+            adjacency[station_index, station_indexes[neighbour_id]] = True
+        for line_id in graph.get_line_ids_by_station_id(station_id):
+            if line_id in line_indexes:
+                incidence[station_index, line_indexes[line_id]] = True
+
+    identity = np.eye(station_count, dtype=bool)
+    # stations sharing a line are reachable without an interchange
+    same_line = (
+        incidence.astype(np.float32) @ incidence.T.astype(np.float32)
+    ) > 0
+    same_line |= identity
+
+    distances = np.empty((2, station_count, station_count), dtype=np.int16)
+    distances[HOPS] = _breadth_first_levels(adjacency, identity)
+    distances[INTERCHANGES] = _breadth_first_levels(same_line, same_line)
+    return station_ids, distances
+
+
+def _save_array(path: str, array: np.ndarray):
+    """Write the array next to its final path and move it into place"""
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        np.save(file, array, allow_pickle=False)
+    os.replace(temporary_path, path)
+
+
+# suffixes of the cached files, prefixed with the key of the data
+_DISTANCES_SUFFIX = ".distances.npy"
+_STATION_IDS_SUFFIX = ".stations.npy"
+
+
+def _graph_sha256(graph: NetworkGraph) -> str:
+    """Hash of the stations, their coordinates and connections
+
+    The loaded data differs from the seed file after a sync, so the cache
+    key covers everything the matrix is built from.
+    """
+    digest = hashlib.sha256()
+    for station in graph.stations:
+        digest.update(
+            repr(
+                (
+                    station.id,
+                    str(station.longitude),
+                    str(station.latitude),
+                    graph.get_line_ids_by_station_id(station.id),
+                    graph.get_neighbours(station.id),
+                )
+            ).encode()
+        )
+    digest.update(repr([line.id for line in graph.lines]).encode())
+    return digest.hexdigest()
+
+
+def _prune_cache(cache_directory: str, key: str):
+    """Remove matrices cached under keys other than the current one"""
+    for file_name in os.listdir(cache_directory):
+        file_key, _, suffix = file_name.partition(".")
+        if file_key != key and f".{suffix}".removesuffix(".tmp") in (
+            _DISTANCES_SUFFIX,
+            _STATION_IDS_SUFFIX,
+        ):
+            os.remove(os.path.join(cache_directory, file_name))
+
+
+def load_or_build_distance_matrix(
+    graph: NetworkGraph, seed_file_path: str, cache_directory: str
+) -> DistanceMatrix:
+    """Memory-map the cached matrix of the loaded data or build and cache it
+
+    Matrices cached for other seed files or loaded data are removed when
+    a new one is built.
+    """
+    key = hashlib.sha256(
+        f"{file_sha256(seed_file_path)}{_graph_sha256(graph)}".encode()
+    ).hexdigest()
+    distances_path = os.path.join(cache_directory, f"{key}{_DISTANCES_SUFFIX}")
+    station_ids_path = os.path.join(
+        cache_directory, f"{key}{_STATION_IDS_SUFFIX}"
+    )
+
+    if os.path.isfile(distances_path) and os.path.isfile(station_ids_path):
+        station_ids = np.load(station_ids_path, allow_pickle=False).tolist()
+        distances = np.load(distances_path, mmap_mode="r", allow_pickle=False)
+        return DistanceMatrix(station_ids, distances)
+
+    station_ids, distances = build_distances(graph)
+    os.makedirs(cache_directory, exist_ok=True)
+    _save_array(station_ids_path, np.array(station_ids, dtype=np.str_))
+    _save_array(distances_path, distances)
+    _prune_cache(cache_directory, key)
+    return DistanceMatrix(station_ids, distances)
@@ -0,0 +1,123 @@
+from collections import defaultdict
+from functools import cached_property
+from typing import Iterable, Optional
+
+from app.models.line import Line
+from app.models.station import Station
+from app.name_search import NameIndex
+from app.spatial_index import StationSpatialIndex
+
+
+class NetworkGraph:
+    """In-memory snapshot of the network used to answer lookups"""
+
+    def __init__(
+        self,
+        stations: Iterable[Station],
+        lines: Iterable[Line],
+        line_stations: Iterable[tuple[int, str]],
+    ):
+        self._stations_by_id = {station.id: station for station in stations}
+        self._lines_by_id = {line.id: line for line in lines}
+
+        station_ids_by_name: dict[str, list[str]] = defaultdict(list)
+        for station in self._stations_by_id.values():
+            station_ids_by_name[station.name].append(station.id)
+
+        line_ids_by_name: dict[str, list[int]] = defaultdict(list)
+        for line in self._lines_by_id.values():
+            line_ids_by_name[line.name].append(line.id)
+
+        line_ids_by_station_id: dict[str, list[int]] = defaultdict(list)
+        station_ids_by_line_id: dict[int, list[str]] = defaultdict(list)
+        for line_id, station_id in line_stations:
+            line_ids_by_station_id[station_id].append(line_id)
+            station_ids_by_line_id[line_id].append(station_id)
+
+        # line_stations come in line order, so consecutive stations of a
+        # line are connected in both directions
+        neighbours: dict[str, list[tuple[str, int]]] = defaultdict(list)
+        for line_id, line_station_ids in station_ids_by_line_id.items():
+            if line_id not in self._lines_by_id:
+                continue
+            station_ids = [
+                station_id
+                for station_id in line_station_ids
+                if station_id in self._stations_by_id
+            ]
+            for previous_id, next_id in zip(station_ids, station_ids[1:]):
+                neighbours[previous_id].append((next_id, line_id))
+                neighbours[next_id].append((previous_id, line_id))
+
+        self._station_ids_by_name = self._freeze(station_ids_by_name)
+        self._line_ids_by_name = self._freeze(line_ids_by_name)
+        self._line_ids_by_station_id = self._freeze(line_ids_by_station_id)
+        self._station_ids_by_line_id = self._freeze(station_ids_by_line_id)
+        self._neighbours = self._freeze(neighbours)
+
+    @staticmethod
+    def _freeze(index: dict) -> dict:
+        """Turn index lists into tuples so that the snapshot stays compact"""
+        return {key: tuple(values) for key, values in index.items()}
+
+    @property
+    def stations(self) -> list[Station]:
+        return list(self._stations_by_id.values())
+
+    @property
+    def lines(self) -> list[Line]:
+        return list(self._lines_by_id.values())
+
+    @cached_property
+    def station_name_index(self) -> NameIndex:
+        return NameIndex(self._station_ids_by_name)
+
+    @cached_property
+    def line_name_index(self) -> NameIndex:
+        return NameIndex(self._line_ids_by_name)
+
+    @cached_property
+    def spatial_index(self) -> StationSpatialIndex:
+        return StationSpatialIndex(self.stations)
+
+    def get_station(self, id: str) -> Optional[Station]:
+        return self._stations_by_id.get(id)
+
+    def get_line(self, id: int) -> Optional[Line]:
+        return self._lines_by_id.get(id)
+
+    def get_station_ids_by_name(self, name: str) -> tuple[str, ...]:
+        return self._station_ids_by_name.get(name, ())
+
+    def get_station_ids_by_line_id(self, id: int) -> tuple[str, ...]:
+        return self._station_ids_by_line_id.get(id, ())
+
+    def get_line_ids_by_station_id(self, id: str) -> tuple[int, ...]:
+        return self._line_ids_by_station_id.get(id, ())
+
+    def get_neighbours(self, id: str) -> tuple[tuple[str, int], ...]:
+        """Return (station id, line id) pairs reachable in one stop"""
+        return self._neighbours.get(id, ())
+
+    def get_lines_by_station_id(self, id: str) -> list[Line]:
+        return [
+            self._lines_by_id[line_id]
+            for line_id in self._line_ids_by_station_id.get(id, ())
+            if line_id in self._lines_by_id
+        ]
+
+    def get_lines_by_station_name(self, name: str) -> list[Line]:
+        lines = []
+        for station_id in self._station_ids_by_name.get(name, ()):
+            lines.extend(self.get_lines_by_station_id(station_id))
+        return lines
+
+    def get_stations_by_line_name(self, name: str) -> list[Station]:
+        stations: list[Station] = []
+        for line_id in self._line_ids_by_name.get(name, ()):
+            stations.extend(
+                self._stations_by_id[station_id]
+                for station_id in self._station_ids_by_line_id.get(line_id, ())
+                if station_id in self._stations_by_id
+            )
+        return stations
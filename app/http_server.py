@@ -0,0 +1,157 @@
+import hashlib
+import json
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from app import constants, repositories
+from app.utils import json_default
+
+# query parameter to the repository lookup answering it, by path
+_LOOKUPS: dict[
+    str,
+    dict[
+        str,
+        Callable[[repositories.LondonTubeNetworkRepository, str], list],
+    ],
+] = {
+    constants.HTTP_LINES_PATH: {
+        constants.STATION_NAME: (
+            repositories.LondonTubeNetworkRepository.get_lines_by_station_name
+        ),
+        constants.STATION_ID: (
+            repositories.LondonTubeNetworkRepository.get_lines_by_station_id
+        ),
+    },
+    constants.HTTP_STATIONS_PATH: {
+        constants.LINE_NAME: (
+            repositories.LondonTubeNetworkRepository.get_stations_by_line_name
+        ),
+    },
+}
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTP server handling connections on a fixed pool of threads"""
+
+    def __init__(
+        self,
+        server_address: tuple[str, int],
+        network_repository: repositories.LondonTubeNetworkRepository,
+        workers: int = constants.HTTP_DEFAULT_WORKERS,
+    ):
+        super().__init__(server_address, QueryRequestHandler)
+        self.network_repository = network_repository
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="http-worker"
+        )
+
+    def process_request(self, request: Any, client_address: Any):
+        self._executor.submit(
+            self._process_request_in_worker, request, client_address
+        )
+
+    def _process_request_in_worker(self, request: Any, client_address: Any):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    # keep-alive, connections idle longer than timeout are closed so that
+    # they do not hold pool workers
+    protocol_version = "HTTP/1.1"
+    timeout = constants.HTTP_KEEP_ALIVE_TIMEOUT
+    # headers and body are separate writes, without this every response
+    # on a kept alive connection waits for the delayed ack of the client
+    disable_nagle_algorithm = True
+    server: PooledHTTPServer
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        lookups = _LOOKUPS.get(url.path)
+        if lookups is None:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "unknown path"})
+            return
+
+        parameters = parse_qs(url.query)
+        given = [name for name in lookups if name in parameters]
+        if len(given) != 1:
+            self._send_json(
+                HTTPStatus.BAD_REQUEST,
+                {"error": f"expected one of {', '.join(lookups)}"},
+            )
+            return
+
+        name = given[0]
+        lookup = lookups[name]
+        try:
+            result = lookup(
+                self.server.network_repository, parameters[name][0]
+            )
+        except Exception:
+            # answer instead of dropping the kept alive connection
+            self.log_error("lookup failed\n%s", traceback.format_exc())
+            self._send_json(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                {"error": "internal server error"},
+            )
+            return
+        self._send_json(HTTPStatus.OK, {"result": result}, cacheable=True)
+
+    def _send_json(
+        self, status: HTTPStatus, content: Any, cacheable: bool = False
+    ):
+        body = json.dumps(content, default=json_default).encode()
+        etag: Optional[str] = None
+        if cacheable:
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if etag in self._if_none_match():
+                status = HTTPStatus.NOT_MODIFIED
+                body = b""
+
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+            self.send_header(
+                "Cache-Control",
+                f"public, max-age={constants.HTTP_CACHE_MAX_AGE}",
+            )
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _if_none_match(self) -> list[str]:
+        header = self.headers.get("If-None-Match", "")
+        return [tag.strip() for tag in header.split(",")]
+
+
+def serve(
+    network_repository: repositories.LondonTubeNetworkRepository,
+    host: str,
+    port: int,
+    workers: int = constants.HTTP_DEFAULT_WORKERS,
+):
+    """Answer queries over HTTP until interrupted"""
+    # load the network before the first request instead of during it
+    network_repository.get_network_graph()
+    with PooledHTTPServer(
+        (host, port), network_repository, workers=workers
+    ) as server:
+        print(f"Serving on http://{host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -1,7 +1,35 @@
 import argparse
+import contextlib
+import json
 import os
+import sys
+from typing import Optional
 
-from app import constants, loaders, repositories
+from app import batch_queries, constants, loaders, repositories, snapshot
+from app.metrics import Metrics
+
+
+def _int(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+
+
+def _positive_int(value: str) -> int:
+    """argparse type accepting integers greater than 0"""
+    number = _int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not greater than 0")
+    return number
+
+
+def _non_negative_int(value: str) -> int:
+    """argparse type accepting integers from 0"""
+    number = _int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"{value} is negative")
+    return number
 
 
 def add_app_arguments(parser: argparse.ArgumentParser):
@@ -34,14 +62,228 @@ def add_app_arguments(parser: argparse.ArgumentParser):
         default="5432",
         help="Specify the connection port number (defaults to 5432)",
     )
+    parser.add_argument(
+        "--sqlite",
+        required=False,
+        help=(
+            "Use an embedded SQLite database stored in the given file"
+            " (':memory:' keeps it in memory) instead of PostgreSQL"
+        ),
+    )
+    parser.add_argument(
+        "--min-connections",
+        type=_non_negative_int,
+        default=1,
+        help="Specify the connections opened upfront (defaults to 1)",
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=_positive_int,
+        default=1,
+        help="Specify the maximum pooled connections (defaults to 1)",
+    )
+    parser.add_argument(
+        "--checkout-timeout",
+        type=float,
+        required=False,
+        help="Specify seconds to wait for a free pooled connection",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=_non_negative_int,
+        default=constants.QUERY_CACHE_MAX_SIZE,
+        help=(
+            "Specify the number of cached query results, 0 disables the"
+            f" cache (defaults to {constants.QUERY_CACHE_MAX_SIZE})"
+        ),
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        required=False,
+        help="Specify seconds after which cached query results expire",
+    )
+    parser.add_argument(
+        "--stream-chunk-size",
+        type=_positive_int,
+        required=False,
+        help=(
+            "Parse the seed file incrementally and load it in chunks of"
+            " the given number of records"
+        ),
+    )
+    parser.add_argument(
+        "--validation-workers",
+        type=_non_negative_int,
+        default=0,
+        help=(
+            "Validate seed records in the given number of processes while"
+            " inserting the validated ones (defaults to 0, inline)"
+        ),
+    )
+    parser.add_argument(
+        "--london-bounds",
+        action="store_true",
+        help="Skip seed stations outside the London tube network area",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help=(
+            "Apply only the differences between the seed file and the"
+            " loaded data instead of skipping loaded tables"
+        ),
+    )
+    parser.add_argument(
+        "--precompute-distances",
+        action="store_true",
+        help=(
+            "Precompute hop and interchange counts between all stations"
+            f" and cache them in {constants.DISTANCES_CACHE_DIRECTORY}"
+        ),
+    )
+    parser.add_argument(
+        "--batch",
+        required=False,
+        metavar="PATH",
+        help=(
+            "Answer json lines queries read from the file ('-' for stdin)"
+            " and write json lines results instead of the interactive menu"
+        ),
+    )
+    parser.add_argument(
+        "--batch-output",
+        required=False,
+        metavar="PATH",
+        help="Write batch results to the file instead of stdout",
+    )
+    parser.add_argument(
+        "--http-port",
+        type=int,
+        required=False,
+        help="Answer queries over HTTP on the port instead of the menu",
+    )
+    parser.add_argument(
+        "--http-host",
+        default=constants.HTTP_DEFAULT_HOST,
+        help=(
+            "Specify the HTTP address"
+            f" (defaults to {constants.HTTP_DEFAULT_HOST})"
+        ),
+    )
+    parser.add_argument(
+        "--http-workers",
+        type=_positive_int,
+        default=constants.HTTP_DEFAULT_WORKERS,
+        help=(
+            "Specify the threads handling HTTP connections"
+            f" (defaults to {constants.HTTP_DEFAULT_WORKERS})"
+        ),
+    )
+    parser.add_argument(
+        "--build-snapshot",
+        required=False,
+        metavar="PATH",
+        help="Compile the loaded network into a snapshot file and exit",
+    )
+    parser.add_argument(
+        "--snapshot",
+        required=False,
+        metavar="PATH",
+        help=(
+            "Serve queries read-only from a snapshot file without"
+            " connecting to a database"
+        ),
+    )
+    parser.add_argument(
+        "--metrics",
+        required=False,
+        metavar="PATH",
+        help=(
+            "Record timing histograms and counters of database calls and"
+            " load phases and write them as json to the file on exit"
+        ),
+    )
+    parser.add_argument(
+        "--slow-query-threshold",
+        type=float,
+        required=False,
+        metavar="SECONDS",
+        help=(
+            "Capture the query plans of selects slower than the threshold"
+            " into the metrics file"
+        ),
+    )
 
 
 def initialize_db(
     network_repository: repositories.LondonTubeNetworkRepository,
+    stream_chunk_size: Optional[int] = None,
+    sync: bool = False,
+    validation_workers: int = 0,
+    metrics: Optional[Metrics] = None,
+    check_london_bounds: bool = False,
 ):
     network_repository.create_tables_if_not_exists()
-    loader = loaders.LondonTubeNetworkLoader(network_repository)
+    loader = loaders.LondonTubeNetworkLoader(
+        network_repository,
+        validation_workers=validation_workers,
+        metrics=metrics,
+        check_london_bounds=check_london_bounds,
+    )
     load_data_file_path = os.path.join(
         os.getcwd(), constants.SEED_DATA_FILE_PATH
     )
-    loader.load_initial_data(load_data_file_path)
+    if sync:
+        loader.sync_data(load_data_file_path)
+    elif stream_chunk_size is not None:
+        loader.stream_initial_data(load_data_file_path, stream_chunk_size)
+    else:
+        loader.load_initial_data(load_data_file_path)
+
+
+def precompute_distances(
+    network_repository: repositories.LondonTubeNetworkRepository,
+):
+    network_repository.load_distance_matrix(
+        seed_file_path=os.path.join(
+            os.getcwd(), constants.SEED_DATA_FILE_PATH
+        ),
+        cache_directory=os.path.join(
+            os.getcwd(), constants.DISTANCES_CACHE_DIRECTORY
+        ),
+    )
+
+
+def build_snapshot(
+    network_repository: repositories.LondonTubeNetworkRepository,
+    file_path: str,
+):
+    snapshot.write_snapshot(network_repository.get_network_graph(), file_path)
+    print(f"Network snapshot has been written to {file_path}")
+
+
+def run_batch(
+    network_repository: repositories.LondonTubeNetworkRepository,
+    input_path: str,
+    output_path: Optional[str] = None,
+):
+    with contextlib.ExitStack() as stack:
+        input_file = (
+            sys.stdin
+            if input_path == "-"
+            else stack.enter_context(open(input_path))
+        )
+        output_file = (
+            stack.enter_context(open(output_path, "w"))
+            if output_path
+            else sys.stdout
+        )
+        batch_queries.run_batch_queries(
+            network_repository, input_file, output_file
+        )
+
+
+def write_metrics(metrics: Metrics, file_path: str):
+    with open(file_path, "w") as file:
+        json.dump(metrics.stats(), file, indent=2)
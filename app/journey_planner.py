@@ -0,0 +1,151 @@
+import heapq
+from collections import deque
+from typing import Iterable, Optional, cast
+
+from app.graph import NetworkGraph
+from app.models.journey import Journey, JourneyLeg
+from app.models.line import Line
+from app.models.station import Station
+
+# (station id, line id) the rider is on while searching by interchanges
+_State = tuple[str, int]
+
+
+def _build_journey(
+    graph: NetworkGraph, station_ids: list[str], line_ids: list[int]
+) -> Journey:
+    """Group consecutive hops travelled on the same line into legs"""
+    # (line id, station ids) of every leg, built into frozen legs at the end
+    legs: list[tuple[int, list[str]]] = []
+    for index, line_id in enumerate(line_ids):
+        if not legs or legs[-1][0] != line_id:
+            legs.append((line_id, [station_ids[index]]))
+        legs[-1][1].append(station_ids[index + 1])
+    return Journey(
+        legs=tuple(
+            JourneyLeg(
+                line=cast(Line, graph.get_line(line_id)),
+                stations=tuple(
+                    cast(Station, graph.get_station(station_id))
+                    for station_id in leg_station_ids
+                ),
+            )
+            for line_id, leg_station_ids in legs
+        )
+    )
+
+
+def _choose_line_ids(graph: NetworkGraph, station_ids: list[str]) -> list[int]:
+    """Pick a line for every hop staying on one line as long as possible"""
+    hops_line_ids = [
+        {
+            line_id
+            for neighbour_id, line_id in graph.get_neighbours(station_id)
+            if neighbour_id == next_station_id
+        }
+        for station_id, next_station_id in zip(station_ids, station_ids[1:])
+    ]
+    line_ids: list[int] = []
+    start = 0
+    while start < len(hops_line_ids):
+        candidates = set(hops_line_ids[start])
+        end = start + 1
+        while end < len(hops_line_ids) and candidates & hops_line_ids[end]:
+            candidates &= hops_line_ids[end]
+            end += 1
+        line_ids.extend([min(candidates)] * (end - start))
+        start = end
+    return line_ids
+
+
+def find_fewest_stops_journey(
+    graph: NetworkGraph,
+    from_station_ids: Iterable[str],
+    to_station_ids: Iterable[str],
+) -> Optional[Journey]:
+    """Breadth-first search for the journey with the fewest stops"""
+    targets = set(to_station_ids)
+    previous: dict[str, Optional[str]] = {
+        station_id: None for station_id in from_station_ids
+    }
+    queue = deque(previous)
+    while queue:
+        station_id = queue.popleft()
+        if station_id in targets:
+            station_ids = []
+            current: Optional[str] = station_id
+            while current is not None:
+                station_ids.append(current)
+                current = previous[current]
+            station_ids.reverse()
+            return _build_journey(
+                graph, station_ids, _choose_line_ids(graph, station_ids)
+            )
+
+        for neighbour_id, _ in graph.get_neighbours(station_id):
+            if neighbour_id not in previous:
+                previous[neighbour_id] = station_id
+                queue.append(neighbour_id)
+    return None
+
+
+def find_fewest_interchanges_journey(
+    graph: NetworkGraph,
+    from_station_ids: Iterable[str],
+    to_station_ids: Iterable[str],
+) -> Optional[Journey]:
+    """Dijkstra search for the journey with the fewest interchanges
+
+    Ties between journeys with the same number of interchanges are broken
+    by the number of stops.
+    """
+    targets = set(to_station_ids)
+    costs: dict[_State, tuple[int, int]] = {}
+    previous: dict[_State, Optional[_State]] = {}
+    heap: list[tuple[int, int, str, int]] = []
+    for station_id in from_station_ids:
+        if station_id in targets:
+            return Journey()
+        for line_id in graph.get_line_ids_by_station_id(station_id):
+            costs[(station_id, line_id)] = (0, 0)
+            previous[(station_id, line_id)] = None
+            heapq.heappush(heap, (0, 0, station_id, line_id))
+
+    while heap:
+        interchanges, stops, station_id, line_id = heapq.heappop(heap)
+        state = (station_id, line_id)
+        if costs[state] < (interchanges, stops):
+            continue
+
+        if station_id in targets:
+            states = []
+            current: Optional[_State] = state
+            while current is not None:
+                states.append(current)
+                current = previous[current]
+            states.reverse()
+            station_ids = [states[0][0]]
+            line_ids = []
+            for station_id, line_id in states[1:]:
+                if station_id != station_ids[-1]:
+                    station_ids.append(station_id)
+                    line_ids.append(line_id)
+            return _build_journey(graph, station_ids, line_ids)
+
+        moves = [
+            ((neighbour_id, line_id), (interchanges, stops + 1))
+            for neighbour_id, neighbour_line_id in graph.get_neighbours(
+                station_id
+            )
+            if neighbour_line_id == line_id
+        ] + [
+            ((station_id, other_line_id), (interchanges + 1, stops))
+            for other_line_id in graph.get_line_ids_by_station_id(station_id)
+            if other_line_id != line_id
+        ]
+        for next_state, cost in moves:
+            if next_state not in costs or cost < costs[next_state]:
+                costs[next_state] = cost
+                previous[next_state] = state
+                heapq.heappush(heap, (*cost, *next_state))
+    return None
@@ -1,86 +1,557 @@
-from typing import Any
+from collections import Counter, defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Optional
 
 from app import constants, validators
 from app.abstractions import DatabaseLoader
+from app.custom_types import LineStations, LoadManifestEntry
+from app.metrics import Metrics, metrics_timer
 from app.models.station import Station
 from app.repositories import LondonTubeNetworkRepository
-from app.utils import read_json
+from app.utils import (
+    chunked,
+    file_sha256,
+    iter_json_arrays,
+    read_json,
+    read_json_keys,
+)
+
+
+def _record_keys(records: Iterable[Any], key: str) -> list[str]:
+    """Return string values of the key in records, valid or not"""
+    return [
+        record[key]
+        for record in records
+        if isinstance(record, dict) and isinstance(record.get(key), str)
+    ]
+
+
+def _station_key(
+    station: Optional[Station],
+) -> Optional[tuple[str, float, float]]:
+    """Comparable station values, numeric columns are read as Decimal"""
+    if station is None:
+        return None
+    return station.name, float(station.longitude), float(station.latitude)
 
 
 class LondonTubeNetworkLoader(DatabaseLoader):
-    def __init__(self, repository: LondonTubeNetworkRepository):
+    def __init__(
+        self,
+        repository: LondonTubeNetworkRepository,
+        validation_workers: int = 0,
+        metrics: Optional[Metrics] = None,
+        check_london_bounds: bool = False,
+    ):
+        """validation_workers processes validate records while the
+        previous ones are inserted, 0 validates them inline.
+        metrics receives the timings of the load phases.
+        check_london_bounds skips stations outside the tube network area.
+        """
         self._repository = repository
+        self._metrics = metrics
+        self._validation_workers = validation_workers
+        self._check_london_bounds = check_london_bounds
+        self._validation_report = validators.ValidationReport()
+        self._seed_hash = ""
+        self._load_manifest: dict[str, LoadManifestEntry] = {}
+
+    @property
+    def validation_report(self) -> validators.ValidationReport:
+        return self._validation_report
+
+    def _timer(self, phase: str):
+        return metrics_timer(self._metrics, f"loader.{phase}")
+
+    def _validate_chunks(
+        self,
+        table: str,
+        records: Iterable[dict[str, Any]],
+        validate: Callable[[list[dict[str, Any]]], validators.ChunkIssues],
+    ) -> Iterator[validators.ValidatedChunk]:
+        """Validate records in chunks keeping their order
+
+        With workers up to twice as many chunks as workers are validated
+        ahead of the consumer, which bounds the memory held by results.
+        Workers send back only the issues by index, the chunk is split
+        here. The validate phase times inline validation or waiting on
+        workers.
+        """
+        phase = f"validate_{table}"
+        chunks = chunked(records, constants.VALIDATION_CHUNK_SIZE)
+        if not self._validation_workers:
+            for chunk in chunks:
+                with self._timer(phase):
+                    result = validators.split_chunk(chunk, validate(chunk))
+                yield result
+            return
+
+        with ProcessPoolExecutor(self._validation_workers) as executor:
+            pending: deque[
+                tuple[list[dict[str, Any]], Future[validators.ChunkIssues]]
+            ] = deque()
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(validate, chunk)))
+                if len(pending) > 2 * self._validation_workers:
+                    with self._timer(phase):
+                        chunk_done, future = pending.popleft()
+                        result = validators.split_chunk(
+                            chunk_done, future.result()
+                        )
+                    yield result
+            while pending:
+                with self._timer(phase):
+                    chunk_done, future = pending.popleft()
+                    result = validators.split_chunk(
+                        chunk_done, future.result()
+                    )
+                yield result
+
+    def _validated_stations(
+        self, stations_raw: Iterable[dict[str, Any]]
+    ) -> Iterator[Station]:
+        """Yield valid stations skipping the corrupted ones"""
+        for valid, issues in self._validate_chunks(
+            constants.STATIONS,
+            stations_raw,
+            partial(
+                validators.validate_stations,
+                check_london_bounds=self._check_london_bounds,
+            ),
+        ):
+            for issue_message, station in issues:
+                self._validation_report.add_issue(
+                    constants.STATIONS, issue_message, station
+                )
+            self._validation_report.add_valid(constants.STATIONS, len(valid))
+            for station in valid:
+                yield Station(
+                    id=station[constants.ID],
+                    name=station[constants.NAME],
+                    longitude=station[constants.LONGITUDE],
+                    latitude=station[constants.LATITUDE],
+                )
+
+    def _validated_lines(
+        self,
+        lines_raw: Iterable[dict[str, Any]],
+        station_ids: set[str],
+    ) -> Iterator[LineStations]:
+        """Yield valid lines skipping the corrupted ones"""
+        for valid, issues in self._validate_chunks(
+            constants.LINES, lines_raw, validators.validate_lines
+        ):
+            for issue_message, line in issues:
+                self._validation_report.add_issue(
+                    constants.LINES, issue_message, line
+                )
+            if valid and not station_ids:
+                raise ValueError(
+                    "No stations are loaded, lines cannot reference them"
+                )
+            for line in valid:
+                # station ids are checked here, they are not sent to workers
+                if any(
+                    station_id not in station_ids
+                    for station_id in line[constants.STATIONS]
+                ):
+                    self._validation_report.add_issue(
+                        constants.LINES,
+                        "one or more station is not loaded",
+                        line,
+                    )
+                    continue
+                self._validation_report.add_valid(constants.LINES, 1)
+                yield LineStations(
+                    name=line[constants.NAME],
+                    station_ids=line[constants.STATIONS],
+                )
+
+    def _print_skipped(self, table: str, data_name: str):
+        skipped_count = self._validation_report.get_skipped_count(table)
+        print(f"Overall skipped {skipped_count} {data_name} data")
+        if skipped_count:
+            print(self._validation_report.format(table))
 
-    def _load_stations(self, stations_raw: list[dict[str, Any]]):
+    def _start_load(self, file_path: str):
+        self._validation_report = validators.ValidationReport()
+        with self._timer("seed_hash"):
+            self._seed_hash = file_sha256(file_path)
+        self._load_manifest = self._repository.get_load_manifest()
+
+    def _get_loaded_count(
+        self, table: str, has_data: Callable[[], bool]
+    ) -> Optional[int]:
+        """Return valid records of the table already loaded from the seed
+        file or None if the table needs no loading
+        """
+        entry = self._load_manifest.get(table)
+        if entry is None:
+            # tables loaded before the manifest existed
+            return None if has_data() else 0
+        if entry.is_complete:
+            return None
+        if entry.row_count and entry.seed_hash != self._seed_hash:
+            raise ValueError(
+                f"Seed file has changed since the interrupted {table} load,"
+                " restore it or recreate the database"
+            )
+        return entry.row_count
+
+    def _manifest_entry(
+        self, table: str, row_count: int, is_complete: bool = False
+    ) -> LoadManifestEntry:
+        return LoadManifestEntry(
+            table=table,
+            seed_hash=self._seed_hash,
+            row_count=row_count,
+            is_complete=is_complete,
+        )
+
+    def _is_load_complete(self, table: str, valid_count: int) -> bool:
+        """A table all records of which were rejected is loaded again on
+        the next start instead of being recorded as complete
+        """
+        if valid_count or not self._validation_report.get_skipped_count(table):
+            return True
+        print(f"No valid {table} data, it will be loaded again next time")
+        return False
+
+    def _load_stations(
+        self,
+        stations_raw: Iterable[dict[str, Any]],
+        chunk_size: Optional[int] = None,
+    ):
         """Load stations data into the database"""
-        if self._repository.is_stations_empty():
+        loaded_count = self._get_loaded_count(
+            constants.STATIONS, self._repository.has_stations
+        )
+        if loaded_count is None:
             print("Stations are already loaded")
             return
 
-        print("Loading stations data...")
-        stations = []
-        corrupted_data_count = 0
-        valid_data_count = 0
-        for station in stations_raw:
-            issue_message = validators.validate_station(station)
-            if issue_message:
-                corrupted_data_count += 1
-                print(f"Skiping data {station}: Reason: {issue_message}")
-            else:
-                valid_data_count += 1
-                stations.append(
-                    Station(
-                        id=station[constants.ID],
-                        name=station[constants.NAME],
-                        longitude=station[constants.LONGITUDE],
-                        latitude=station[constants.LATITUDE],
+        if loaded_count:
+            print(f"Resuming stations load after {loaded_count} stations...")
+        else:
+            print("Loading stations data...")
+        valid_data_count = loaded_count
+        # the first loaded_count valid records are in the database already
+        stations_to_load = islice(
+            self._validated_stations(stations_raw), loaded_count, None
+        )
+        for stations in chunked(stations_to_load, chunk_size):
+            with self._repository.transaction():
+                with self._timer("insert_stations"):
+                    self._repository.insert_station_batch(stations)
+                valid_data_count += len(stations)
+                with self._timer("manifest"):
+                    self._repository.update_load_manifest(
+                        [
+                            self._manifest_entry(
+                                constants.STATIONS, valid_data_count
+                            )
+                        ]
                     )
-                )
+        is_complete = self._is_load_complete(
+            constants.STATIONS, valid_data_count
+        )
+        with self._timer("manifest"):
+            self._repository.update_load_manifest(
+                [
+                    self._manifest_entry(
+                        constants.STATIONS,
+                        valid_data_count,
+                        is_complete=is_complete,
+                    )
+                ]
+            )
 
-        self._repository.insert_station_batch(stations)
-        print(f"{valid_data_count} station data has been successfully added")
-        print(f"Overall skipped {corrupted_data_count} station data")
+        print(
+            f"{valid_data_count - loaded_count} station data"
+            " has been successfully added"
+        )
+        self._print_skipped(constants.STATIONS, "station")
 
-    def _seed_lines(self, lines_raw: list[dict[str, Any]]):
+    def _seed_lines(
+        self,
+        lines_raw: Iterable[dict[str, Any]],
+        chunk_size: Optional[int] = None,
+    ):
         """Load lines data into the database"""
-        if self._repository.is_lines_empty():
+        loaded_count = self._get_loaded_count(
+            constants.LINES, self._repository.has_lines
+        )
+        if loaded_count is None:
             print("Lines are already loaded")
             return
 
-        print("Loading lines data...")
-        corrupted_data_count = 0
-        lines_added_count = 0
-        line_stations_added_count = 0
-        for line in lines_raw:
-            issue_message = validators.validate_line(line)
-            if issue_message:
-                corrupted_data_count += 1
-                print(f"Skiping data {line}: Reason: {issue_message}")
-            else:
-                line_id = self._repository.insert_line(
-                    line_name=line[constants.NAME]
-                )
-                lines_added_count += 1
-                self._repository.insert_line_stations(
-                    line_id=line_id,
-                    station_ids=line[constants.STATIONS],
+        if loaded_count:
+            print(f"Resuming lines load after {loaded_count} lines...")
+        else:
+            print("Loading lines data...")
+        line_stations_entry = self._load_manifest.get(constants.LINE_STATIONS)
+        loaded_line_stations_count = (
+            line_stations_entry.row_count if line_stations_entry else 0
+        )
+        lines_count = loaded_count
+        line_stations_count = loaded_line_stations_count
+        # line_stations references stations, lines with unknown ones fail
+        with self._timer("read_station_ids"):
+            station_ids = self._repository.get_station_ids()
+        lines_to_load = islice(
+            self._validated_lines(lines_raw, station_ids), loaded_count, None
+        )
+        for lines in chunked(lines_to_load, chunk_size):
+            with self._repository.transaction():
+                with self._timer("insert_lines"):
+                    self._repository.insert_lines_batch(lines)
+                lines_count += len(lines)
+                line_stations_count += sum(
+                    len(line.station_ids) for line in lines
                 )
-                line_stations_added_count += len(line[constants.STATIONS])
-        print(f"{lines_added_count} line data has been successfully added")
+                with self._timer("manifest"):
+                    self._repository.update_load_manifest(
+                        [
+                            self._manifest_entry(constants.LINES, lines_count),
+                            self._manifest_entry(
+                                constants.LINE_STATIONS, line_stations_count
+                            ),
+                        ]
+                    )
+        is_complete = self._is_load_complete(constants.LINES, lines_count)
+        with self._timer("manifest"):
+            self._repository.update_load_manifest(
+                [
+                    self._manifest_entry(
+                        constants.LINES, lines_count, is_complete=is_complete
+                    ),
+                    self._manifest_entry(
+                        constants.LINE_STATIONS,
+                        line_stations_count,
+                        is_complete=is_complete,
+                    ),
+                ]
+            )
+
+        print(
+            f"{lines_count - loaded_count} line data"
+            " has been successfully added"
+        )
         print(
             (
-                f"{line_stations_added_count} line station data"
-                " has been successfully added"
+                f"{line_stations_count - loaded_line_stations_count}"
+                " line station data has been successfully added"
             )
         )
-        print(f"Overall skipped {corrupted_data_count} lines data")
+        self._print_skipped(constants.LINES, "lines")
 
     def load_initial_data(self, file_path: str):
         """Load data into the database"""
-        data = read_json(file_path)
+        with self._timer("read_seed"):
+            data = read_json(file_path)
+        if constants.STATIONS not in data:
+            raise ValueError("No stations data is provided")
+        if constants.LINES not in data:
+            raise ValueError("No lines data is provided")
+        self._start_load(file_path)
+        with self._timer("load"), self._repository.transaction():
+            self._load_stations(data[constants.STATIONS])
+            self._seed_lines(data[constants.LINES])
+
+    def stream_initial_data(self, file_path: str, chunk_size: int):
+        """Load data into the database parsing the file incrementally
+
+        Records are validated as they are read and written in chunks of
+        chunk_size, each chunk in its own transaction, so memory usage
+        does not depend on the file size. Progress is recorded in the
+        load manifest with every chunk, an interrupted load resumes after
+        the records loaded before. The file is scanned for both keys
+        before anything is written, then read once for stations and once
+        for lines, so lines always see the stations whatever the key order.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size should be at least 1")
+        with self._timer("read_seed"):
+            file_keys = read_json_keys(
+                file_path, (constants.STATIONS, constants.LINES)
+            )
+        if constants.STATIONS not in file_keys:
+            raise ValueError("No stations data is provided")
+        if constants.LINES not in file_keys:
+            raise ValueError("No lines data is provided")
+
+        self._start_load(file_path)
+        with self._timer("load"):
+            self._load_stations(
+                self._iter_items(file_path, constants.STATIONS), chunk_size
+            )
+            self._seed_lines(
+                self._iter_items(file_path, constants.LINES), chunk_size
+            )
+
+    @staticmethod
+    def _iter_items(file_path: str, key: str) -> Iterator[Any]:
+        """Yield items of the top level array under key"""
+        for _, item in iter_json_arrays(file_path, keys=(key,)):
+            yield item
+
+    def sync_data(self, file_path: str):
+        """Apply the differences between the file and the database
+
+        Changed and new stations are upserted and only the line stations
+        of changed lines are added, moved or removed, all in a single
+        transaction so readers never see a half applied update.
+
+        Stations are identified by id and lines by name. Only records
+        missing from the file are removed, records that fail validation
+        and lines whose name is not unique are skipped and keep their
+        stored data.
+        """
+        with self._timer("read_seed"):
+            data = read_json(file_path)
         if constants.STATIONS not in data:
             raise ValueError("No stations data is provided")
         if constants.LINES not in data:
             raise ValueError("No lines data is provided")
-        self._load_stations(data[constants.STATIONS])
-        self._seed_lines(data[constants.LINES])
+        self._start_load(file_path)
+
+        file_station_ids = set(
+            _record_keys(data[constants.STATIONS], constants.ID)
+        )
+        line_name_counts = Counter(
+            _record_keys(data[constants.LINES], constants.NAME)
+        )
+        stations = {
+            station.id: station
+            for station in self._validated_stations(data[constants.STATIONS])
+        }
+        unique_lines_raw = []
+        for line in data[constants.LINES]:
+            name = line.get(constants.NAME) if isinstance(line, dict) else None
+            if isinstance(name, str) and line_name_counts[name] > 1:
+                self._validation_report.add_issue(
+                    constants.LINES, "line name is not unique", line
+                )
+            else:
+                unique_lines_raw.append(line)
+        lines = {
+            line.name: line
+            for line in self._validated_lines(unique_lines_raw, set(stations))
+        }
+
+        with self._timer("sync"), self._repository.transaction():
+            graph = self._repository.get_network_graph()
+            changed_stations = [
+                station
+                for station in stations.values()
+                if _station_key(graph.get_station(station.id))
+                != _station_key(station)
+            ]
+
+            stored_line_ids: dict[str, list[int]] = defaultdict(list)
+            for stored_line in graph.lines:
+                stored_line_ids[stored_line.name].append(stored_line.id)
+            removed_line_ids = [
+                line_id
+                for name, line_ids in stored_line_ids.items()
+                if name not in line_name_counts
+                for line_id in line_ids
+            ]
+            new_lines = [
+                line
+                for name, line in lines.items()
+                if name not in stored_line_ids
+            ]
+            upserted_line_stations: list[tuple[int, str, int]] = []
+            removed_line_stations: list[tuple[int, str]] = []
+            # stations of the stored lines left as they are
+            kept_station_ids: set[str] = set()
+            kept_line_count = 0
+            for name, line_ids in stored_line_ids.items():
+                if name not in line_name_counts:
+                    continue
+                if name not in lines or len(line_ids) > 1:
+                    # skipped in the file or ambiguous in the database
+                    kept_line_count += len(line_ids)
+                    for line_id in line_ids:
+                        kept_station_ids.update(
+                            graph.get_station_ids_by_line_id(line_id)
+                        )
+                    continue
+                line_id = line_ids[0]
+                stored_positions = {
+                    station_id: position
+                    for position, station_id in enumerate(
+                        graph.get_station_ids_by_line_id(line_id)
+                    )
+                }
+                positions = {
+                    station_id: position
+                    for position, station_id in enumerate(
+                        lines[name].station_ids
+                    )
+                }
+                upserted_line_stations.extend(
+                    (line_id, station_id, position)
+                    for station_id, position in positions.items()
+                    if stored_positions.get(station_id) != position
+                )
+                removed_line_stations.extend(
+                    (line_id, station_id)
+                    for station_id in stored_positions
+                    if station_id not in positions
+                )
+            removed_station_ids = [
+                station.id
+                for station in graph.stations
+                if station.id not in file_station_ids
+                and station.id not in kept_station_ids
+            ]
+
+            # stations first, line stations reference them, and stations
+            # are removed last when nothing references them any more
+            if changed_stations:
+                self._repository.upsert_stations(changed_stations)
+            if removed_line_ids:
+                self._repository.delete_lines(removed_line_ids)
+            if removed_line_stations:
+                self._repository.delete_line_stations(removed_line_stations)
+            if upserted_line_stations:
+                self._repository.upsert_line_stations(upserted_line_stations)
+            if new_lines:
+                self._repository.insert_lines_batch(new_lines)
+            if removed_station_ids:
+                self._repository.delete_stations(removed_station_ids)
+            self._repository.update_load_manifest(
+                [
+                    self._manifest_entry(
+                        constants.STATIONS, len(stations), is_complete=True
+                    ),
+                    self._manifest_entry(
+                        constants.LINES, len(lines), is_complete=True
+                    ),
+                    self._manifest_entry(
+                        constants.LINE_STATIONS,
+                        sum(len(line.station_ids) for line in lines.values()),
+                        is_complete=True,
+                    ),
+                ]
+            )
+
+        self._print_skipped(constants.STATIONS, "station")
+        self._print_skipped(constants.LINES, "lines")
+        print(f"{len(changed_stations)} station data has been upserted")
+        print(f"{len(removed_station_ids)} station data has been removed")
+        print(f"{len(new_lines)} line data has been added")
+        print(f"{len(removed_line_ids)} line data has been removed")
+        print(f"{kept_line_count} line data has been kept unchanged")
+        print(
+            f"{len(upserted_line_stations)} line station data"
+            " has been upserted"
+        )
+        print(
+            f"{len(removed_line_stations)} line station data"
+            " has been removed"
+        )
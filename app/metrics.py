@@ -0,0 +1,156 @@
+import bisect
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Iterator, Optional
+
+from app import constants
+from app.abstractions import QueryHook
+from app.query_events import QueryEvent
+
+
+class Histogram:
+    """Distribution of durations in exponential buckets
+
+    Bucket i counts values up to HISTOGRAM_MIN_SECONDS * 2 ** i, the
+    last bucket everything above, percentiles are bucket upper bounds.
+    """
+
+    _BOUNDS = [
+        constants.HISTOGRAM_MIN_SECONDS * 2**index
+        for index in range(constants.HISTOGRAM_BUCKETS)
+    ]
+
+    def __init__(self):
+        self.counts = [0] * (len(self._BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self._BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent: float) -> float:
+        rank = self.count * percent / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return (
+                    self._BOUNDS[index]
+                    if index < len(self._BOUNDS)
+                    else self.max
+                )
+        return 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.count if self.count else 0,
+            "p50_seconds": self.percentile(50),
+            "p99_seconds": self.percentile(99),
+            "max_seconds": self.max,
+            "buckets": {
+                f"le_{bound:g}": count
+                for bound, count in zip(self._BOUNDS, self.counts)
+                if count
+            },
+        }
+
+
+class Metrics:
+    """Thread-safe registry of duration histograms and counters"""
+
+    def __init__(
+        self, max_slow_queries: int = constants.METRICS_MAX_SLOW_QUERIES
+    ):
+        self._lock = threading.Lock()
+        self._histograms: dict[str, Histogram] = {}
+        self._counters: Counter[str] = Counter()
+        self._slow_queries: deque[dict[str, Any]] = deque(
+            maxlen=max_slow_queries
+        )
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def add_slow_query(self, event: QueryEvent):
+        with self._lock:
+            self._slow_queries.append(
+                {
+                    "method": event.method,
+                    "shape": event.shape,
+                    "seconds": event.seconds,
+                    "phases": dict(event.phases),
+                    "query": event.query,
+                    "plan": event.plan,
+                }
+            )
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "timings": {
+                    name: histogram.to_dict()
+                    for name, histogram in sorted(self._histograms.items())
+                },
+                "counters": dict(sorted(self._counters.items())),
+                "slow_queries": list(self._slow_queries),
+            }
+
+
+def metrics_timer(
+    metrics: Optional[Metrics], name: str
+) -> ContextManager[None]:
+    """Time the block into metrics if there are any"""
+    return metrics.timer(name) if metrics is not None else nullcontext()
+
+
+class MetricsHook(QueryHook):
+    """Query hook aggregating database calls into metrics
+
+    Calls are timed per method, per method phase and per method and
+    query shape, slow selects are kept with their plans.
+    """
+
+    def __init__(self, metrics: Metrics):
+        self._metrics = metrics
+
+    def before_query(self, event: QueryEvent):
+        pass
+
+    def after_query(self, event: QueryEvent):
+        metrics = self._metrics
+        seconds = event.seconds
+        metrics.record(f"db.{event.method}", seconds)
+        for phase, phase_seconds in event.phases.items():
+            metrics.record(f"db.{event.method}.{phase}", phase_seconds)
+        if event.shape:
+            metrics.record(f"db.{event.method}[{event.shape}]", seconds)
+        metrics.count(f"db.{event.method}.calls")
+        metrics.count(f"db.{event.method}.rows", event.row_count)
+        if event.error is not None:
+            metrics.count(f"db.{event.method}.errors")
+        if event.plan:
+            metrics.add_slow_query(event)
@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+
+from app.models.line import Line
+from app.models.station import Station
+
+
+@dataclass(frozen=True, slots=True)
+class JourneyLeg:
+    line: Line
+    stations: tuple[Station, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Journey:
+    legs: tuple[JourneyLeg, ...] = ()
+
+    @property
+    def stops(self) -> int:
+        return sum(len(leg.stations) - 1 for leg in self.legs)
+
+    @property
+    def interchanges(self) -> int:
+        return max(len(self.legs) - 1, 0)
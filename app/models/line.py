@@ -1,7 +1,11 @@
+import sys
 from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Line:
     id: int = field(repr=False)
     name: str
+
+    def __post_init__(self):
+        object.__setattr__(self, "name", sys.intern(self.name))
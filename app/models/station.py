@@ -1,9 +1,15 @@
+import sys
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Station:
     id: str
     name: str
     longitude: float
     latitude: float
+
+    def __post_init__(self):
+        # ids and names repeat across rows and indexes, share one copy
+        object.__setattr__(self, "id", sys.intern(self.id))
+        object.__setattr__(self, "name", sys.intern(self.name))
@@ -0,0 +1,93 @@
+import re
+from collections import Counter
+from typing import Iterable
+
+from app import constants
+
+_NON_ALPHANUMERIC = re.compile(r"[^0-9a-z ]+")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase the name and drop punctuation, e.g. "King's" -> "kings\" """
+    return " ".join(_NON_ALPHANUMERIC.sub("", name.lower()).split())
+
+
+def _trigrams(normalized_name: str) -> set[str]:
+    padded = f"  {normalized_name} "
+    return {padded[index : index + 3] for index in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "names")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        self.names: set[str] = set()
+
+
+class NameIndex:
+    """Prefix trie and trigram index over a set of names"""
+
+    def __init__(self, names: Iterable[str]):
+        self._root = _TrieNode()
+        self._trigram_counts: dict[str, int] = {}
+        self._names_by_trigram: dict[str, list[str]] = {}
+        for name in set(names):
+            normalized_name = normalize_name(name)
+            words = normalized_name.split(" ")
+            # every word starts a prefix so "cross" completes "King's Cross"
+            for index in range(len(words)):
+                self._insert(" ".join(words[index:]), name)
+
+            trigrams = _trigrams(normalized_name)
+            self._trigram_counts[name] = len(trigrams)
+            for trigram in trigrams:
+                self._names_by_trigram.setdefault(trigram, []).append(name)
+
+    def _insert(self, key: str, name: str):
+        node = self._root
+        node.names.add(name)
+        for character in key:
+            node = node.children.setdefault(character, _TrieNode())
+            node.names.add(name)
+
+    def complete(
+        self, prefix: str, limit: int = constants.NAME_SUGGESTIONS_LIMIT
+    ) -> list[str]:
+        """Return names having a word starting with the prefix"""
+        node = self._root
+        for character in normalize_name(prefix):
+            if character not in node.children:
+                return []
+            node = node.children[character]
+        return sorted(node.names, key=lambda name: (len(name), name))[:limit]
+
+    def search(
+        self, query: str, limit: int = constants.NAME_SUGGESTIONS_LIMIT
+    ) -> list[str]:
+        """Return names similar to the query ranked by trigram similarity"""
+        trigrams = _trigrams(normalize_name(query))
+        shared_counts: Counter[str] = Counter()
+        for trigram in trigrams:
+            shared_counts.update(self._names_by_trigram.get(trigram, ()))
+
+        scored_names = []
+        for name, shared_count in shared_counts.items():
+            similarity = (
+                2 * shared_count / (len(trigrams) + self._trigram_counts[name])
+            )
+            if similarity >= constants.NAME_SEARCH_MIN_SIMILARITY:
+                scored_names.append((-similarity, name))
+        return [name for _, name in sorted(scored_names)[:limit]]
+
+    def suggest(
+        self, query: str, limit: int = constants.NAME_SUGGESTIONS_LIMIT
+    ) -> list[str]:
+        """Return prefix completions followed by typo-tolerant matches"""
+        suggestions = self.complete(query, limit)
+        for name in self.search(query, limit):
+            if len(suggestions) >= limit:
+                break
+            if name not in suggestions:
+                suggestions.append(name)
+        return suggestions
@@ -0,0 +1,83 @@
+from types import ModuleType
+from typing import Any, Optional
+
+from app import constants
+
+# Builders take the driver's sql module (psycopg2.sql or psycopg.sql), both
+# expose the same composition API, so sync and async databases share them.
+
+
+def to_valid_identifier(sql_module: ModuleType, value: str) -> Any:
+    """Quote dotted name like "lines.id" component by component"""
+    return sql_module.SQL(".").join(
+        [sql_module.Identifier(component) for component in value.split(".")]
+    )
+
+
+def compose_select(
+    sql_module: ModuleType,
+    table: str,
+    columns: list[str],
+    join_tables: Optional[list[str]] = None,
+    left_ons: Optional[list[str]] = None,
+    right_ons: Optional[list[str]] = None,
+    filter_colummn: Optional[str] = None,
+    placeholder: str = "%s",
+    match_any: bool = False,
+) -> Any:
+    """Compose select query optionally joining tables and filtering rows
+
+    With match_any the filter compares the column against an array of
+    values and the matched value is selected first as FILTER_VALUE.
+    """
+    sql = sql_module
+    selected = [to_valid_identifier(sql, column) for column in columns]
+    if match_any and filter_colummn:
+        selected.insert(
+            0,
+            sql.SQL("{column} AS {alias}").format(
+                column=to_valid_identifier(sql, filter_colummn),
+                alias=sql.Identifier(constants.FILTER_VALUE),
+            ),
+        )
+    query = sql.SQL("SELECT {columns} FROM {table}").format(
+        columns=sql.SQL(",").join(selected),
+        table=to_valid_identifier(sql, table),
+    )
+
+    if join_tables and left_ons and right_ons:
+        query += sql.SQL(" ") + sql.SQL(" ").join(
+            [
+                sql.SQL("JOIN {table} ON {left_on} = {right_on}").format(
+                    table=to_valid_identifier(sql, join_table),
+                    left_on=to_valid_identifier(sql, left_on),
+                    right_on=to_valid_identifier(sql, right_on),
+                )
+                for join_table, left_on, right_on in zip(
+                    join_tables, left_ons, right_ons
+                )
+            ]
+        )
+
+    if filter_colummn:
+        value = f"ANY({placeholder})" if match_any else placeholder
+        query += sql.SQL(" ") + sql.SQL("WHERE {column} = {value}").format(
+            column=to_valid_identifier(sql, filter_colummn),
+            value=sql.SQL(value),
+        )
+    return query
+
+
+def describe_select(
+    table: str,
+    join_tables: Optional[list[str]] = None,
+    filter_colummn: Optional[str] = None,
+    match_any: bool = False,
+) -> str:
+    """Name the shape of a select for metrics, values left out"""
+    shape = table
+    if join_tables:
+        shape += f" JOIN {','.join(join_tables)}"
+    if filter_colummn:
+        shape += f" {'IN' if match_any else 'BY'} {filter_colummn}"
+    return shape
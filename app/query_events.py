@@ -0,0 +1,49 @@
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import ContextManager, Iterator, Optional
+
+
+@dataclass
+class QueryEvent:
+    """One database call as passed to query hooks"""
+
+    method: str
+    shape: str
+    phases: dict[str, float] = field(default_factory=dict)
+    row_count: int = 0
+    query: str = ""
+    # EXPLAIN output captured when the call was slower than the threshold
+    plan: str = ""
+    error: Optional[BaseException] = None
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.phases.values())
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (
+                self.phases.get(name, 0) + time.perf_counter() - start
+            )
+
+
+_UNTIMED_PHASE: ContextManager[None] = nullcontext()
+
+
+class _DisabledQueryEvent(QueryEvent):
+    """Event of databases without hooks, phases are not timed"""
+
+    def phase(self, name: str) -> ContextManager[None]:  # type: ignore
+        return _UNTIMED_PHASE
+
+
+DISABLED_QUERY_EVENT = _DisabledQueryEvent(method="", shape="")
+# reusable, unlike a generator based context manager
+DISABLED_INSTRUMENT: ContextManager[QueryEvent] = nullcontext(
+    DISABLED_QUERY_EVENT
+)
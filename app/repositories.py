@@ -1,13 +1,187 @@
-from app import constants
-from app.custom_types import Column
-from app.databases import Database
+import functools
+import inspect
+import threading
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Iterator,
+    Mapping,
+    Optional,
+    Sequence,
+    TypeVar,
+    cast,
+)
+
+from app import constants, journey_planner
+from app.abstractions import AsyncDatabase, Cache, Database
+from app.custom_types import (
+    Column,
+    Index,
+    LineStations,
+    LoadManifestEntry,
+    SelectQuery,
+)
+from app.distance_matrix import DistanceMatrix, load_or_build_distance_matrix
+from app.graph import NetworkGraph
+from app.metrics import Metrics, metrics_timer
+from app.models.journey import Journey
 from app.models.line import Line
 from app.models.station import Station
+from app.spatial_index import StationDistance
+
+ReadMethod = TypeVar("ReadMethod", bound=Callable[..., Any])
+Model = TypeVar("Model")
+
+_CACHE_MISS = object()
+
+
+def _cached(method: ReadMethod) -> ReadMethod:
+    """Serve repeated calls of the read method from the repository cache
+
+    Positional and keyword calls share a cache entry. A result is only
+    stored if no write invalidated the read data while it was computed.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self: "LondonTubeNetworkRepository", *args, **kwargs):
+        if self._cache is None:
+            return method(self, *args, **kwargs)
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        key = (method.__name__, *arguments.args[1:])
+        result = self._cache.get(key, _CACHE_MISS)
+        if result is _CACHE_MISS:
+            generation = self._read_generation
+            result = method(self, *args, **kwargs)
+            with self._read_generation_lock:
+                if generation == self._read_generation:
+                    self._cache.set(key, result)
+        # models are frozen, a list copy keeps callers from changing the
+        # cached result
+        return list(result) if isinstance(result, list) else result
+
+    return cast(ReadMethod, wrapper)
+
+
+def _row_to_line(row: Mapping[str, Any]) -> Line:
+    return Line(id=row[constants.ID], name=row[constants.NAME])
+
+
+def _row_to_station(row: Mapping[str, Any]) -> Station:
+    return Station(
+        id=row[constants.ID],
+        name=row[constants.NAME],
+        longitude=row[constants.LONGITUDE],
+        latitude=row[constants.LATITUDE],
+    )
+
+
+def _lines_by_station_id_query(id: Optional[str]) -> SelectQuery:
+    return SelectQuery(
+        table=constants.LINES,
+        columns=[
+            f"{constants.LINES}.{constants.ID}",
+            f"{constants.LINES}.{constants.NAME}",
+        ],
+        join_tables=[constants.LINE_STATIONS],
+        left_ons=[
+            f"{constants.LINE_STATIONS}.{constants.LINE_ID}",
+        ],
+        right_ons=[
+            f"{constants.LINES}.{constants.ID}",
+        ],
+        filter_colummn=f"{constants.LINE_STATIONS}.{constants.STATION_ID}",
+        filter_value=id,
+    )
+
+
+def _lines_by_station_name_query(name: Optional[str]) -> SelectQuery:
+    return SelectQuery(
+        table=constants.STATIONS,
+        columns=[
+            f"{constants.LINES}.{constants.ID}",
+            f"{constants.LINES}.{constants.NAME}",
+        ],
+        join_tables=[constants.LINE_STATIONS, constants.LINES],
+        left_ons=[
+            f"{constants.STATIONS}.{constants.ID}",
+            f"{constants.LINE_STATIONS}.{constants.LINE_ID}",
+        ],
+        right_ons=[
+            f"{constants.LINE_STATIONS}.{constants.STATION_ID}",
+            f"{constants.LINES}.{constants.ID}",
+        ],
+        filter_colummn=f"{constants.STATIONS}.{constants.NAME}",
+        filter_value=name,
+    )
+
+
+def _stations_by_line_name_query(name: Optional[str]) -> SelectQuery:
+    return SelectQuery(
+        table=constants.STATIONS,
+        columns=[
+            f"{constants.STATIONS}.{constants.ID}",
+            f"{constants.STATIONS}.{constants.NAME}",
+            f"{constants.STATIONS}.{constants.LONGITUDE}",
+            f"{constants.STATIONS}.{constants.LATITUDE}",
+        ],
+        join_tables=[constants.LINE_STATIONS, constants.LINES],
+        left_ons=[
+            f"{constants.STATIONS}.{constants.ID}",
+            f"{constants.LINE_STATIONS}.{constants.LINE_ID}",
+        ],
+        right_ons=[
+            f"{constants.LINE_STATIONS}.{constants.STATION_ID}",
+            f"{constants.LINES}.{constants.ID}",
+        ],
+        filter_colummn=f"{constants.LINES}.{constants.NAME}",
+        filter_value=name,
+    )
 
 
 class LondonTubeNetworkRepository:
-    def __init__(self, database: Database) -> None:
-        self._database = database
+    def __init__(
+        self,
+        database: Optional[Database],
+        use_network_graph: bool = True,
+        cache: Optional[Cache] = None,
+        network_graph: Optional[NetworkGraph] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        """Without a database the repository is read-only and serves
+        every lookup from the given network graph, metrics receives the
+        timings of network graph loads and of building models from rows
+        """
+        if database is None and network_graph is None:
+            raise ValueError("Either database or network graph is required")
+        self._database_or_none = database
+        self._use_network_graph = use_network_graph or database is None
+        self._cache = cache
+        self._metrics = metrics
+        self._network_graph = network_graph
+        self._distance_matrix: Optional[DistanceMatrix] = None
+        self._network_graph_lock = threading.Lock()
+        # incremented by every invalidation, results computed across one
+        # are not cached
+        self._read_generation = 0
+        self._read_generation_lock = threading.Lock()
+        # identity map, a row of the same id is always the same instance
+        self._stations_by_id: dict[str, Station] = {}
+        self._lines_by_id: dict[int, Line] = {}
+
+    @property
+    def _database(self) -> Database:
+        if self._database_or_none is None:
+            raise RuntimeError(
+                "Repository is served from a snapshot and has no database"
+            )
+        return self._database_or_none
+
+    @property
+    def is_read_only(self) -> bool:
+        return self._database_or_none is None
 
     def _create_stations_table_if_not_exists(self):
         """Create Stations table in the database"""
@@ -21,7 +195,15 @@ class LondonTubeNetworkRepository:
             Column(name=constants.LONGITUDE, data_type=constants.NUMERIC),
             Column(name=constants.LATITUDE, data_type=constants.NUMERIC),
         ]
-        self._database.create_table(table=constants.STATIONS, columns=columns)
+        indexes = [
+            # lines by station name filter
+            Index(
+                name=constants.STATIONS_NAME_INDEX, columns=(constants.NAME,)
+            )
+        ]
+        self._database.create_table(
+            table=constants.STATIONS, columns=columns, indexes=indexes
+        )
 
     def _create_lines_table_if_not_exists(self):
         """Create lines table in the database"""
@@ -33,7 +215,13 @@ class LondonTubeNetworkRepository:
             ),
             Column(name=constants.NAME, data_type=constants.VARCHAR),
         ]
-        self._database.create_table(table=constants.LINES, columns=columns)
+        indexes = [
+            # stations by line name filter
+            Index(name=constants.LINES_NAME_INDEX, columns=(constants.NAME,))
+        ]
+        self._database.create_table(
+            table=constants.LINES, columns=columns, indexes=indexes
+        )
 
     def _create_line_stations_table_if_not_exists(self):
         """Create line_stations table in the database"""
@@ -42,22 +230,54 @@ class LondonTubeNetworkRepository:
                 name=constants.LINE_ID,
                 data_type=constants.INT,
                 is_primary_key=True,
+                is_foreign_key=True,
+                foreign_key_table=constants.LINES,
+                foreign_key_column=constants.ID,
             ),
             Column(
                 name=constants.STATION_ID,
                 data_type=constants.CHAR_11,
                 is_primary_key=True,
+                is_foreign_key=True,
+                foreign_key_table=constants.STATIONS,
+                foreign_key_column=constants.ID,
+            ),
+            Column(name=constants.POSITION, data_type=constants.INT),
+        ]
+        indexes = [
+            # the primary key is led by line_id, lines by station id filter
+            # needs its own index, line_id makes it cover the join
+            Index(
+                name=constants.LINE_STATIONS_STATION_ID_INDEX,
+                columns=(constants.STATION_ID, constants.LINE_ID),
+            )
+        ]
+        self._database.create_table(
+            table=constants.LINE_STATIONS, columns=columns, indexes=indexes
+        )
+
+    def _create_load_manifest_table_if_not_exists(self):
+        """Create load_manifest table in the database"""
+        columns = [
+            Column(
+                name=constants.TABLE_NAME,
+                data_type=constants.VARCHAR,
+                is_primary_key=True,
             ),
+            Column(name=constants.SEED_HASH, data_type=constants.VARCHAR),
+            Column(name=constants.ROW_COUNT, data_type=constants.INT),
+            Column(name=constants.IS_COMPLETE, data_type=constants.BOOLEAN),
         ]
         self._database.create_table(
-            table=constants.LINE_STATIONS, columns=columns
+            table=constants.LOAD_MANIFEST, columns=columns
         )
 
     def create_tables_if_not_exists(self):
-        """Create required tables"""
+        """Create required tables and add columns missing from old ones"""
         self._create_stations_table_if_not_exists()
         self._create_lines_table_if_not_exists()
         self._create_line_stations_table_if_not_exists()
+        self._create_load_manifest_table_if_not_exists()
 
     def insert_station_batch(self, stations: list[Station]):
         """Insert stations data with batch"""
@@ -76,119 +296,540 @@ class LondonTubeNetworkRepository:
             )
             for station in stations
         ]
-        self._database.insert_batch(
+        self._database.copy_batch(
             table=constants.STATIONS,
             columns=columns,
             values=values,
         )
+        self._invalidate_read_data()
+
+    def insert_lines_batch(self, lines: list[LineStations]) -> list[int]:
+        """Insert lines with their stations and return line ids"""
+        line_ids = self._database.reserve_ids(
+            table=constants.LINES, column=constants.ID, count=len(lines)
+        )
+        self._database.copy_batch(
+            table=constants.LINES,
+            columns=[constants.ID, constants.NAME],
+            values=[
+                (line_id, line.name) for line_id, line in zip(line_ids, lines)
+            ],
+        )
+        self._database.copy_batch(
+            table=constants.LINE_STATIONS,
+            columns=[
+                constants.LINE_ID,
+                constants.STATION_ID,
+                constants.POSITION,
+            ],
+            values=[
+                (line_id, station_id, position)
+                for line_id, line in zip(line_ids, lines)
+                for position, station_id in enumerate(line.station_ids)
+            ],
+        )
+        self._invalidate_read_data()
+        return line_ids
+
+    def upsert_stations(self, stations: list[Station]):
+        """Insert new stations and update the changed ones"""
+        self._database.upsert(
+            table=constants.STATIONS,
+            columns=[
+                constants.ID,
+                constants.NAME,
+                constants.LONGITUDE,
+                constants.LATITUDE,
+            ],
+            values=[
+                (
+                    station.id,
+                    station.name,
+                    station.longitude,
+                    station.latitude,
+                )
+                for station in stations
+            ],
+            conflict_columns=[constants.ID],
+        )
+        self._invalidate_read_data()
+
+    def delete_stations(self, station_ids: list[str]):
+        """Delete stations, they must not be on any line"""
+        self._database.delete(
+            table=constants.STATIONS,
+            filter_columns=[constants.ID],
+            values=[(station_id,) for station_id in station_ids],
+        )
+        self._invalidate_read_data()
+
+    def delete_lines(self, line_ids: list[int]):
+        """Delete lines together with their line stations"""
+        values = [(line_id,) for line_id in line_ids]
+        self._database.delete(
+            table=constants.LINE_STATIONS,
+            filter_columns=[constants.LINE_ID],
+            values=values,
+        )
+        self._database.delete(
+            table=constants.LINES, filter_columns=[constants.ID], values=values
+        )
+        self._invalidate_read_data()
+
+    def upsert_line_stations(self, values: list[tuple[int, str, int]]):
+        """Insert (line id, station id, position) rows or move the
+        existing ones to the new position
+        """
+        self._database.upsert(
+            table=constants.LINE_STATIONS,
+            columns=[
+                constants.LINE_ID,
+                constants.STATION_ID,
+                constants.POSITION,
+            ],
+            values=values,
+            conflict_columns=[constants.LINE_ID, constants.STATION_ID],
+        )
+        self._invalidate_read_data()
+
+    def delete_line_stations(self, values: list[tuple[int, str]]):
+        """Delete (line id, station id) rows"""
+        self._database.delete(
+            table=constants.LINE_STATIONS,
+            filter_columns=[constants.LINE_ID, constants.STATION_ID],
+            values=values,
+        )
+        self._invalidate_read_data()
 
     def insert_line(self, line_name: str) -> int:
         """Insert line row and return line id"""
-        return self._database.insert(
+        line_id = self._database.insert(
             table=constants.LINES,
             columns=[constants.NAME],
             value=(line_name,),
             return_column=constants.ID,
         )
+        self._invalidate_read_data()
+        return line_id
 
     def insert_line_stations(self, line_id: int, station_ids: list[str]):
-        """Insert line stations"""
-        columns = [constants.LINE_ID, constants.STATION_ID]
+        """Insert line stations keeping their order on the line"""
+        columns = [constants.LINE_ID, constants.STATION_ID, constants.POSITION]
         values = [
             (
                 line_id,
                 station_id,
+                position,
             )
-            for station_id in station_ids
+            for position, station_id in enumerate(station_ids)
         ]
         self._database.insert_batch(
             table=constants.LINE_STATIONS,
             columns=columns,
             values=values,
         )
+        self._invalidate_read_data()
+
+    def get_station_ids(self) -> set[str]:
+        rows = self._database.select(
+            table=constants.STATIONS, columns=[constants.ID]
+        )
+        return {row[constants.ID] for row in rows}
 
-    def is_stations_empty(self):
+    def transaction(self) -> ContextManager[None]:
+        """Group the enclosed writes in a single database transaction"""
+        return self._database.transaction()
+
+    def has_stations(self) -> bool:
         return self._database.data_exists(constants.STATIONS)
 
-    def is_lines_empty(self):
+    def has_lines(self) -> bool:
         return self._database.data_exists(constants.LINES)
 
-    def get_lines_by_station_id(self, id: str):
+    def get_load_manifest(self) -> dict[str, LoadManifestEntry]:
+        """Return the load progress of every table by table name"""
         rows = self._database.select(
-            table=constants.LINES,
+            table=constants.LOAD_MANIFEST,
             columns=[
-                f"{constants.LINES}.{constants.ID}",
-                f"{constants.LINES}.{constants.NAME}",
-            ],
-            join_tables=[constants.LINE_STATIONS],
-            left_ons=[
-                f"{constants.LINE_STATIONS}.{constants.LINE_ID}",
+                constants.TABLE_NAME,
+                constants.SEED_HASH,
+                constants.ROW_COUNT,
+                constants.IS_COMPLETE,
             ],
-            right_ons=[
-                f"{constants.LINES}.{constants.ID}",
+        )
+        return {
+            row[constants.TABLE_NAME]: LoadManifestEntry(
+                table=row[constants.TABLE_NAME],
+                seed_hash=row[constants.SEED_HASH],
+                row_count=row[constants.ROW_COUNT],
+                is_complete=bool(row[constants.IS_COMPLETE]),
+            )
+            for row in rows
+        }
+
+    def update_load_manifest(self, entries: list[LoadManifestEntry]):
+        """Record the load progress of the tables"""
+        self._database.upsert(
+            table=constants.LOAD_MANIFEST,
+            columns=[
+                constants.TABLE_NAME,
+                constants.SEED_HASH,
+                constants.ROW_COUNT,
+                constants.IS_COMPLETE,
             ],
-            filter_colummn=f"{constants.LINE_STATIONS}.{constants.STATION_ID}",
-            filter_value=id,
+            values=[tuple(entry) for entry in entries],
+            conflict_columns=[constants.TABLE_NAME],
         )
 
-        return [
-            Line(id=row[constants.ID], name=row[constants.NAME])
-            for row in rows
-        ]
+    def _invalidate_read_data(self):
+        """Drop in-memory data derived from the tables after a write
 
-    def get_lines_by_station_name(self, name: str) -> list[Line]:
-        rows = self._database.select(
+        Not under _network_graph_lock, a graph load holding it may wait
+        for the database the write transaction holds. The generation
+        keeps a load overlapping the write from storing its graph.
+        """
+        with self._read_generation_lock:
+            self._read_generation += 1
+            self._network_graph = None
+            self._distance_matrix = None
+            self._stations_by_id = {}
+            self._lines_by_id = {}
+            if self._cache is not None:
+                self._cache.clear()
+
+    def _get_or_add_station(
+        self, id: str, name: str, longitude: float, latitude: float
+    ) -> Station:
+        """Return the mapped station of the row, replaced if it differs
+
+        Rows read after the cache expired may carry changes made outside
+        this process, those must not be answered with the old instance.
+        """
+        station = self._stations_by_id.get(id)
+        if station is None:
+            station = self._stations_by_id.setdefault(
+                id, Station(id, name, longitude, latitude)
+            )
+        elif (
+            station.name != name
+            or station.longitude != longitude
+            or station.latitude != latitude
+        ):
+            station = Station(id, name, longitude, latitude)
+            self._stations_by_id[id] = station
+        return station
+
+    def _get_or_add_line(self, id: int, name: str) -> Line:
+        line = self._lines_by_id.get(id)
+        if line is None:
+            line = self._lines_by_id.setdefault(id, Line(id, name))
+        elif line.name != name:
+            line = self._lines_by_id[id] = Line(id, name)
+        return line
+
+    def _build_timer(self, method: str) -> ContextManager[None]:
+        """Time turning rows into models apart from the database calls"""
+        return metrics_timer(self._metrics, f"repository.{method}.build")
+
+    def _row_to_station(self, row: Mapping[str, Any]) -> Station:
+        return self._get_or_add_station(
+            row[constants.ID],
+            row[constants.NAME],
+            row[constants.LONGITUDE],
+            row[constants.LATITUDE],
+        )
+
+    def _row_to_line(self, row: Mapping[str, Any]) -> Line:
+        return self._get_or_add_line(row[constants.ID], row[constants.NAME])
+
+    def _load_network_graph(self) -> NetworkGraph:
+        """Read every table once and build the in-memory network graph"""
+        station_rows = self._database.select_tuples(
             table=constants.STATIONS,
             columns=[
-                f"{constants.LINES}.{constants.ID}",
-                f"{constants.LINES}.{constants.NAME}",
-            ],
-            join_tables=[constants.LINE_STATIONS, constants.LINES],
-            left_ons=[
-                f"{constants.STATIONS}.{constants.ID}",
-                f"{constants.LINE_STATIONS}.{constants.LINE_ID}",
+                constants.ID,
+                constants.NAME,
+                constants.LONGITUDE,
+                constants.LATITUDE,
             ],
-            right_ons=[
-                f"{constants.LINE_STATIONS}.{constants.STATION_ID}",
-                f"{constants.LINES}.{constants.ID}",
-            ],
-            filter_colummn=f"{constants.STATIONS}.{constants.NAME}",
-            filter_value=name,
         )
+        line_rows = self._database.select_tuples(
+            table=constants.LINES,
+            columns=[constants.ID, constants.NAME],
+        )
+        # (line id, station id, position) sorted into line order
+        line_station_rows = sorted(
+            self._database.select_tuples(
+                table=constants.LINE_STATIONS,
+                columns=[
+                    constants.LINE_ID,
+                    constants.STATION_ID,
+                    constants.POSITION,
+                ],
+            ),
+            # line stations stored before positions keep the order they
+            # are read in, as they did before the column was added
+            key=lambda row: (row[0], row[2] is not None, row[2] or 0),
+        )
+        with self._build_timer("load_network_graph"):
+            return NetworkGraph(
+                stations=[
+                    self._get_or_add_station(*row) for row in station_rows
+                ],
+                lines=[self._get_or_add_line(*row) for row in line_rows],
+                line_stations=[
+                    (line_id, station_id)
+                    for line_id, station_id, _ in line_station_rows
+                ],
+            )
 
-        return [
-            Line(id=row[constants.ID], name=row[constants.NAME])
-            for row in rows
-        ]
+    def get_network_graph(self) -> NetworkGraph:
+        """Return the network graph, loading it on first use"""
+        network_graph = self._network_graph
+        if network_graph is None:
+            with self._network_graph_lock:
+                network_graph = self._network_graph
+                if network_graph is None:
+                    generation = self._read_generation
+                    with metrics_timer(
+                        self._metrics, "repository.load_network_graph"
+                    ):
+                        network_graph = self._load_network_graph()
+                    # a graph loaded across a write answers this call only
+                    with self._read_generation_lock:
+                        if generation == self._read_generation:
+                            self._network_graph = network_graph
+        return network_graph
+
+    @_cached
+    def get_lines_by_station_id(self, id: str) -> list[Line]:
+        if self._use_network_graph:
+            return self.get_network_graph().get_lines_by_station_id(id)
+        rows = self._database.select_tuples(*_lines_by_station_id_query(id))
+        with self._build_timer("get_lines_by_station_id"):
+            return [self._get_or_add_line(*row) for row in rows]
 
+    @_cached
+    def get_lines_by_station_name(self, name: str) -> list[Line]:
+        if self._use_network_graph:
+            return self.get_network_graph().get_lines_by_station_name(name)
+        query = _lines_by_station_name_query(name)
+        rows = self._database.select_tuples(*query)
+        with self._build_timer("get_lines_by_station_name"):
+            return [self._get_or_add_line(*row) for row in rows]
+
+    @_cached
     def get_stations_by_line_name(self, name: str) -> list[Station]:
-        rows = self._database.select(
+        if self._use_network_graph:
+            return self.get_network_graph().get_stations_by_line_name(name)
+        query = _stations_by_line_name_query(name)
+        rows = self._database.select_tuples(*query)
+        with self._build_timer("get_stations_by_line_name"):
+            return [self._get_or_add_station(*row) for row in rows]
+
+    def iter_stations(
+        self, itersize: int = constants.SELECT_ITER_SIZE
+    ) -> Iterator[Station]:
+        """Yield every station streamed from the database
+
+        Streamed models bypass the identity map and the network graph,
+        so memory stays flat however many rows there are.
+        """
+        rows = self._database.select_iter(
             table=constants.STATIONS,
             columns=[
-                f"{constants.STATIONS}.{constants.ID}",
-                f"{constants.STATIONS}.{constants.NAME}",
-                f"{constants.STATIONS}.{constants.LONGITUDE}",
-                f"{constants.STATIONS}.{constants.LATITUDE}",
-            ],
-            join_tables=[constants.LINE_STATIONS, constants.LINES],
-            left_ons=[
-                f"{constants.STATIONS}.{constants.ID}",
-                f"{constants.LINE_STATIONS}.{constants.LINE_ID}",
-            ],
-            right_ons=[
-                f"{constants.LINE_STATIONS}.{constants.STATION_ID}",
-                f"{constants.LINES}.{constants.ID}",
+                constants.ID,
+                constants.NAME,
+                constants.LONGITUDE,
+                constants.LATITUDE,
             ],
-            filter_colummn=f"{constants.LINES}.{constants.NAME}",
-            filter_value=name,
+            itersize=itersize,
         )
+        return (Station(*row) for row in rows)
 
-        return [
-            Station(
-                id=row[constants.ID],
-                name=row[constants.NAME],
-                longitude=row[constants.LONGITUDE],
-                latitude=row[constants.LATITUDE],
+    def iter_lines(
+        self, itersize: int = constants.SELECT_ITER_SIZE
+    ) -> Iterator[Line]:
+        """Yield every line streamed from the database"""
+        rows = self._database.select_iter(
+            table=constants.LINES,
+            columns=[constants.ID, constants.NAME],
+            itersize=itersize,
+        )
+        return (Line(*row) for row in rows)
+
+    def iter_lines_by_station_id(
+        self, id: str, itersize: int = constants.SELECT_ITER_SIZE
+    ) -> Iterator[Line]:
+        query = _lines_by_station_id_query(id)
+        rows = self._database.select_iter(*query, itersize=itersize)
+        return (Line(*row) for row in rows)
+
+    def iter_lines_by_station_name(
+        self, name: str, itersize: int = constants.SELECT_ITER_SIZE
+    ) -> Iterator[Line]:
+        query = _lines_by_station_name_query(name)
+        rows = self._database.select_iter(*query, itersize=itersize)
+        return (Line(*row) for row in rows)
+
+    def iter_stations_by_line_name(
+        self, name: str, itersize: int = constants.SELECT_ITER_SIZE
+    ) -> Iterator[Station]:
+        query = _stations_by_line_name_query(name)
+        rows = self._database.select_iter(*query, itersize=itersize)
+        return (Station(*row) for row in rows)
+
+    def get_lines_by_station_ids(
+        self, ids: Sequence[str]
+    ) -> dict[str, list[Line]]:
+        """Return lines of every station id using a single query"""
+        if self._use_network_graph:
+            graph = self.get_network_graph()
+            return {id: graph.get_lines_by_station_id(id) for id in ids}
+        query = _lines_by_station_id_query(None)
+        return self._select_grouped(
+            "get_lines_by_station_ids", query, ids, self._row_to_line
+        )
+
+    def get_lines_by_station_names(
+        self, names: Sequence[str]
+    ) -> dict[str, list[Line]]:
+        """Return lines of every station name using a single query"""
+        if self._use_network_graph:
+            graph = self.get_network_graph()
+            return {
+                name: graph.get_lines_by_station_name(name) for name in names
+            }
+        query = _lines_by_station_name_query(None)
+        return self._select_grouped(
+            "get_lines_by_station_names", query, names, self._row_to_line
+        )
+
+    def get_stations_by_line_names(
+        self, names: Sequence[str]
+    ) -> dict[str, list[Station]]:
+        """Return stations of every line name using a single query"""
+        if self._use_network_graph:
+            graph = self.get_network_graph()
+            return {
+                name: graph.get_stations_by_line_name(name) for name in names
+            }
+        query = _stations_by_line_name_query(None)
+        return self._select_grouped(
+            "get_stations_by_line_names", query, names, self._row_to_station
+        )
+
+    def _select_grouped(
+        self,
+        method: str,
+        query: SelectQuery,
+        keys: Sequence[str],
+        row_to_model: Callable[[Mapping[str, Any]], Model],
+    ) -> dict[str, list[Model]]:
+        """Run query for all keys at once and group models by the key"""
+        results: dict[str, list[Model]] = {key: [] for key in keys}
+        rows = self._database.select_many(
+            table=query.table,
+            columns=query.columns,
+            join_tables=query.join_tables,
+            left_ons=query.left_ons,
+            right_ons=query.right_ons,
+            filter_colummn=query.filter_colummn,
+            filter_values=list(results),
+        )
+        with self._build_timer(method):
+            for row in rows:
+                results.setdefault(row[constants.FILTER_VALUE], []).append(
+                    row_to_model(row)
+                )
+        return results
+
+    @_cached
+    def get_fewest_stops_journey(
+        self, from_station_name: str, to_station_name: str
+    ) -> Optional[Journey]:
+        graph = self.get_network_graph()
+        return journey_planner.find_fewest_stops_journey(
+            graph,
+            graph.get_station_ids_by_name(from_station_name),
+            graph.get_station_ids_by_name(to_station_name),
+        )
+
+    @_cached
+    def get_fewest_interchanges_journey(
+        self, from_station_name: str, to_station_name: str
+    ) -> Optional[Journey]:
+        graph = self.get_network_graph()
+        return journey_planner.find_fewest_interchanges_journey(
+            graph,
+            graph.get_station_ids_by_name(from_station_name),
+            graph.get_station_ids_by_name(to_station_name),
+        )
+
+    def load_distance_matrix(self, seed_file_path: str, cache_directory: str):
+        """Precompute all-pairs distances or memory-map the cached ones"""
+        self._distance_matrix = load_or_build_distance_matrix(
+            self.get_network_graph(), seed_file_path, cache_directory
+        )
+
+    def get_hops_between(
+        self, from_station_id: str, to_station_id: str
+    ) -> Optional[int]:
+        if self._distance_matrix is not None:
+            return self._distance_matrix.get_hops(
+                from_station_id, to_station_id
             )
-            for row in rows
-        ]
+        journey = journey_planner.find_fewest_stops_journey(
+            self.get_network_graph(), [from_station_id], [to_station_id]
+        )
+        return journey.stops if journey else None
+
+    def get_interchanges_between(
+        self, from_station_id: str, to_station_id: str
+    ) -> Optional[int]:
+        if self._distance_matrix is not None:
+            return self._distance_matrix.get_interchanges(
+                from_station_id, to_station_id
+            )
+        journey = journey_planner.find_fewest_interchanges_journey(
+            self.get_network_graph(), [from_station_id], [to_station_id]
+        )
+        return journey.interchanges if journey else None
+
+    def get_nearest_stations(
+        self, longitude: float, latitude: float, count: int
+    ) -> list[StationDistance]:
+        return self.get_network_graph().spatial_index.get_nearest_stations(
+            longitude, latitude, count
+        )
+
+    def get_stations_within_radius(
+        self, longitude: float, latitude: float, radius: float
+    ) -> list[StationDistance]:
+        spatial_index = self.get_network_graph().spatial_index
+        return spatial_index.get_stations_within_radius(
+            longitude, latitude, radius
+        )
+
+    def suggest_station_names(self, query: str) -> list[str]:
+        return self.get_network_graph().station_name_index.suggest(query)
+
+    def suggest_line_names(self, query: str) -> list[str]:
+        return self.get_network_graph().line_name_index.suggest(query)
+
+
+class AsyncLondonTubeNetworkRepository:
+    def __init__(self, database: AsyncDatabase) -> None:
+        self._database = database
+
+    async def get_lines_by_station_id(self, id: str) -> list[Line]:
+        rows = await self._database.select(*_lines_by_station_id_query(id))
+        return [_row_to_line(row) for row in rows]
+
+    async def get_lines_by_station_name(self, name: str) -> list[Line]:
+        rows = await self._database.select(*_lines_by_station_name_query(name))
+        return [_row_to_line(row) for row in rows]
+
+    async def get_stations_by_line_name(self, name: str) -> list[Station]:
+        rows = await self._database.select(*_stations_by_line_name_query(name))
+        return [_row_to_station(row) for row in rows]
@@ -0,0 +1,196 @@
+import mmap
+import struct
+from array import array
+from typing import Any, BinaryIO, Iterator, Literal
+
+from app import constants
+from app.graph import NetworkGraph
+from app.models.line import Line
+from app.models.station import Station
+
+# magic, version, byte order mark, strings, stations, lines, line stations
+_HEADER = struct.Struct("=4sIIIIII")
+_BYTE_ORDER_MARK = 0x01020304
+_ALIGNMENT = 8
+
+# array formats of the sections
+SectionFormat = Literal["B", "I", "q", "d"]
+
+# Sections follow the header in this order, each padded to _ALIGNMENT:
+#   string offsets       uint32[strings + 1]
+#   string table         utf-8 bytes of all distinct strings
+#   station id strings   uint32[stations]
+#   station name strings uint32[stations]
+#   longitudes           float64[stations]
+#   latitudes            float64[stations]
+#   line ids             int64[lines]
+#   line name strings    uint32[lines]
+#   line station offsets uint32[lines + 1]  (CSR row offsets)
+#   line station indexes uint32[line stations]  (in line order)
+
+
+def _write_section(file: BinaryIO, data: bytes):
+    file.write(data)
+    file.write(b"\0" * (-len(data) % _ALIGNMENT))
+
+
+def write_snapshot(graph: NetworkGraph, file_path: str):
+    """Compile the network graph into a binary snapshot file"""
+    strings: dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        return strings.setdefault(value, len(strings))
+
+    stations = graph.stations
+    lines = graph.lines
+    station_indexes = {
+        station.id: index for index, station in enumerate(stations)
+    }
+    station_id_strings = array("I", [intern(s.id) for s in stations])
+    station_name_strings = array("I", [intern(s.name) for s in stations])
+    line_name_strings = array("I", [intern(line.name) for line in lines])
+
+    line_station_offsets = array("I", [0])
+    line_station_indexes = array("I")
+    for line in lines:
+        line_station_indexes.extend(
+            station_indexes[station_id]
+            for station_id in graph.get_station_ids_by_line_id(line.id)
+            if station_id in station_indexes
+        )
+        line_station_offsets.append(len(line_station_indexes))
+
+    encoded_strings = [value.encode() for value in strings]
+    string_offsets = array("I", [0])
+    for encoded in encoded_strings:
+        string_offsets.append(string_offsets[-1] + len(encoded))
+
+    with open(file_path, "wb") as file:
+        _write_section(
+            file,
+            _HEADER.pack(
+                constants.SNAPSHOT_MAGIC,
+                constants.SNAPSHOT_VERSION,
+                _BYTE_ORDER_MARK,
+                len(strings),
+                len(stations),
+                len(lines),
+                len(line_station_indexes),
+            ),
+        )
+        _write_section(file, string_offsets.tobytes())
+        _write_section(file, b"".join(encoded_strings))
+        _write_section(file, station_id_strings.tobytes())
+        _write_section(file, station_name_strings.tobytes())
+        _write_section(
+            file, array("d", [float(s.longitude) for s in stations]).tobytes()
+        )
+        _write_section(
+            file, array("d", [float(s.latitude) for s in stations]).tobytes()
+        )
+        _write_section(file, array("q", [line.id for line in lines]).tobytes())
+        _write_section(file, line_name_strings.tobytes())
+        _write_section(file, line_station_offsets.tobytes())
+        _write_section(file, line_station_indexes.tobytes())
+
+
+class NetworkSnapshot:
+    """Read-only memory-mapped view over a snapshot file
+
+    Columns are exposed as memoryviews over the mapping, nothing is
+    parsed or copied until a value is read. Lookups are not served from
+    the mapping, to_network_graph decodes it into a NetworkGraph once.
+    """
+
+    def __init__(self, file_path: str):
+        with open(file_path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        (
+            magic,
+            version,
+            byte_order_mark,
+            string_count,
+            station_count,
+            line_count,
+            line_station_count,
+        ) = _HEADER.unpack_from(self._view)
+        if magic != constants.SNAPSHOT_MAGIC:
+            raise ValueError("File is not a network snapshot")
+        if version != constants.SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}")
+        if byte_order_mark != _BYTE_ORDER_MARK:
+            raise ValueError("Snapshot was built on another byte order")
+
+        self._position = _HEADER.size + (-_HEADER.size % _ALIGNMENT)
+        self._string_offsets = self._section("I", string_count + 1)
+        self._strings = self._section("B", self._string_offsets[-1])
+        self.station_id_strings = self._section("I", station_count)
+        self.station_name_strings = self._section("I", station_count)
+        self.longitudes = self._section("d", station_count)
+        self.latitudes = self._section("d", station_count)
+        self.line_ids = self._section("q", line_count)
+        self.line_name_strings = self._section("I", line_count)
+        self.line_station_offsets = self._section("I", line_count + 1)
+        self.line_station_indexes = self._section("I", line_station_count)
+
+    def _section(self, format: SectionFormat, count: int) -> "memoryview[Any]":
+        size = struct.calcsize(format) * count
+        section = self._view[self._position : self._position + size]
+        self._position += size + (-size % _ALIGNMENT)
+        return section.cast(format)
+
+    def get_string(self, index: int) -> str:
+        start = self._string_offsets[index]
+        end = self._string_offsets[index + 1]
+        return str(self._strings[start:end], "utf-8")
+
+    def _iter_stations(self) -> Iterator[Station]:
+        for index in range(len(self.station_id_strings)):
+            yield Station(
+                id=self.get_string(self.station_id_strings[index]),
+                name=self.get_string(self.station_name_strings[index]),
+                longitude=self.longitudes[index],
+                latitude=self.latitudes[index],
+            )
+
+    def to_network_graph(self) -> NetworkGraph:
+        stations = list(self._iter_stations())
+        lines = [
+            Line(id=line_id, name=self.get_string(name_string))
+            for line_id, name_string in zip(
+                self.line_ids, self.line_name_strings
+            )
+        ]
+        line_stations = [
+            (line.id, stations[self.line_station_indexes[position]].id)
+            for line_index, line in enumerate(lines)
+            for position in range(
+                self.line_station_offsets[line_index],
+                self.line_station_offsets[line_index + 1],
+            )
+        ]
+        return NetworkGraph(
+            stations=stations, lines=lines, line_stations=line_stations
+        )
+
+    def close(self):
+        for view in vars(self).values():
+            if isinstance(view, memoryview):
+                view.release()
+        self._mmap.close()
+
+
+def read_snapshot(file_path: str) -> NetworkGraph:
+    """Build the network graph from a snapshot file
+
+    The file is decoded in full and closed, lookups, journeys and the
+    name and spatial indexes then run on the in-memory graph. Startup
+    skips the database, seed file parsing and validation, not the graph
+    build.
+    """
+    snapshot = NetworkSnapshot(file_path)
+    try:
+        return snapshot.to_network_graph()
+    finally:
+        snapshot.close()
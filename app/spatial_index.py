@@ -0,0 +1,149 @@
+import math
+from typing import Sequence
+
+import numpy as np
+
+from app import constants
+from app.models.station import Station
+
+# station together with its distance from the queried point in metres
+StationDistance = tuple[Station, float]
+
+
+def haversine_distances(
+    longitudes: np.ndarray,
+    latitudes: np.ndarray,
+    longitude: float,
+    latitude: float,
+) -> np.ndarray:
+    """Great-circle distances in metres from the point to every coordinate"""
+    longitudes = np.radians(longitudes)
+    latitudes = np.radians(latitudes)
+    longitude = math.radians(longitude)
+    latitude = math.radians(latitude)
+    a = (
+        np.sin((latitudes - latitude) / 2) ** 2
+        + np.cos(latitudes)
+        * math.cos(latitude)
+        * np.sin((longitudes - longitude) / 2) ** 2
+    )
+    return 2 * constants.EARTH_RADIUS_METRES * np.arcsin(np.sqrt(a))
+
+
+def _check_finite(**values: float):
+    """Reject nan and infinite query values, they have no grid cell"""
+    for name, value in values.items():
+        if not math.isfinite(value):
+            raise ValueError(f"{name} should be a finite number")
+
+
+class StationSpatialIndex:
+    """Uniform grid over station coordinates for proximity queries"""
+
+    def __init__(
+        self,
+        stations: Sequence[Station],
+        cell_size: float = constants.SPATIAL_INDEX_CELL_SIZE,
+    ):
+        self._stations = list(stations)
+        self._cell_size = cell_size
+        self._longitudes = np.array(
+            [float(station.longitude) for station in self._stations],
+            dtype=np.float64,
+        )
+        self._latitudes = np.array(
+            [float(station.latitude) for station in self._stations],
+            dtype=np.float64,
+        )
+        cells: dict[tuple[int, int], list[int]] = {}
+        for index, (longitude, latitude) in enumerate(
+            zip(self._longitudes, self._latitudes)
+        ):
+            cells.setdefault(self._cell(longitude, latitude), []).append(index)
+        self._cells = {
+            cell: np.array(indexes, dtype=np.intp)
+            for cell, indexes in cells.items()
+        }
+        self._all_indexes = np.arange(len(self._stations), dtype=np.intp)
+
+    def _cell(self, longitude: float, latitude: float) -> tuple[int, int]:
+        return (
+            math.floor(longitude / self._cell_size),
+            math.floor(latitude / self._cell_size),
+        )
+
+    def _candidate_indexes(
+        self, longitude: float, latitude: float, radius: float
+    ) -> np.ndarray:
+        """Indexes of stations in the grid cells covering the radius"""
+        latitude_delta = math.degrees(radius / constants.EARTH_RADIUS_METRES)
+        widest_latitude = abs(latitude) + latitude_delta
+        if widest_latitude >= 90:
+            return self._all_indexes
+        longitude_delta = latitude_delta / math.cos(
+            math.radians(widest_latitude)
+        )
+        if (
+            longitude - longitude_delta < -180
+            or longitude + longitude_delta > 180
+        ):
+            return self._all_indexes
+
+        min_x, min_y = self._cell(
+            longitude - longitude_delta, latitude - latitude_delta
+        )
+        max_x, max_y = self._cell(
+            longitude + longitude_delta, latitude + latitude_delta
+        )
+        if (max_x - min_x + 1) * (max_y - min_y + 1) >= len(self._cells):
+            return self._all_indexes
+
+        indexes = [
+            self._cells[(x, y)]
+            for x in range(min_x, max_x + 1)
+            for y in range(min_y, max_y + 1)
+            if (x, y) in self._cells
+        ]
+        if not indexes:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(indexes)
+
+    def get_stations_within_radius(
+        self, longitude: float, latitude: float, radius: float
+    ) -> list[StationDistance]:
+        """Return stations within radius metres ordered by distance"""
+        _check_finite(longitude=longitude, latitude=latitude, radius=radius)
+        indexes = self._candidate_indexes(longitude, latitude, radius)
+        distances = haversine_distances(
+            self._longitudes[indexes],
+            self._latitudes[indexes],
+            longitude,
+            latitude,
+        )
+        within = distances <= radius
+        indexes = indexes[within]
+        distances = distances[within]
+        order = np.argsort(distances, kind="stable")
+        return [
+            (self._stations[indexes[position]], float(distances[position]))
+            for position in order
+        ]
+
+    def get_nearest_stations(
+        self, longitude: float, latitude: float, count: int
+    ) -> list[StationDistance]:
+        """Return count stations closest to the point ordered by distance"""
+        _check_finite(longitude=longitude, latitude=latitude)
+        if count <= 0 or not self._stations:
+            return []
+
+        radius: float = constants.SPATIAL_INDEX_INITIAL_RADIUS
+        # everything on earth is within half of its circumference
+        max_radius = math.pi * constants.EARTH_RADIUS_METRES
+        while True:
+            stations = self.get_stations_within_radius(
+                longitude, latitude, radius
+            )
+            if len(stations) >= count or radius >= max_radius:
+                return stations[:count]
+            radius = min(radius * 2, max_radius)
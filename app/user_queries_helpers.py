@@ -1,4 +1,9 @@
+import math
+from typing import Optional
+
 from app import constants, repositories
+from app.models.journey import Journey
+from app.spatial_index import StationDistance
 
 
 def _print_possible_queries():
@@ -23,9 +28,27 @@ def _print_possible_queries():
             f" {constants.QUERY_BY_STATION_ID}"
         )
     )
+    print(f"{constants.QUERY_JOURNEY_NUMBER}. {constants.QUERY_JOURNEY}")
+    print(
+        (
+            f"{constants.QUERY_NEAREST_STATIONS_NUMBER}."
+            f" {constants.QUERY_NEAREST_STATIONS}"
+        )
+    )
+    print(
+        (
+            f"{constants.QUERY_STATIONS_WITHIN_RADIUS_NUMBER}."
+            f" {constants.QUERY_STATIONS_WITHIN_RADIUS}"
+        )
+    )
     print()
 
 
+def _print_suggestions(names: list[str]):
+    if names:
+        print(f"Did you mean: {', '.join(names)}?")
+
+
 def _handle_by_line_name_query(
     network_repository: repositories.LondonTubeNetworkRepository,
 ):
@@ -33,6 +56,7 @@ def _handle_by_line_name_query(
     stations = network_repository.get_stations_by_line_name(line_name)
     if not stations:
         print("No stations found, maybe the entered name is invalid")
+        _print_suggestions(network_repository.suggest_line_names(line_name))
     else:
         print(
             (
@@ -51,6 +75,9 @@ def _handle_by_station_name_query(
     lines = network_repository.get_lines_by_station_name(station_name)
     if not lines:
         print("No lines found, maybe the entered name is invalid")
+        _print_suggestions(
+            network_repository.suggest_station_names(station_name)
+        )
     else:
         print(
             (
@@ -80,6 +107,108 @@ def _handle_by_station_id_query(
             print(line)
 
 
+def _print_journey(title: str, journey: Optional[Journey]):
+    if journey is None:
+        print(f"{title}: no journey found")
+        return
+
+    print(
+        (
+            f"{title} ({journey.stops} stops,"
+            f" {journey.interchanges} interchanges):"
+        )
+    )
+    for leg in journey.legs:
+        station_names = " -> ".join(station.name for station in leg.stations)
+        print(f"  {leg.line.name}: {station_names}")
+
+
+def _handle_journey_query(
+    network_repository: repositories.LondonTubeNetworkRepository,
+):
+    from_station_name = input("Enter the name of the departure station: ")
+    to_station_name = input("Enter the name of the destination station: ")
+    graph = network_repository.get_network_graph()
+    if not graph.get_station_ids_by_name(from_station_name):
+        print(f"No station found by name '{from_station_name}'")
+        _print_suggestions(
+            network_repository.suggest_station_names(from_station_name)
+        )
+    elif not graph.get_station_ids_by_name(to_station_name):
+        print(f"No station found by name '{to_station_name}'")
+        _print_suggestions(
+            network_repository.suggest_station_names(to_station_name)
+        )
+    else:
+        _print_journey(
+            "Fewest stops",
+            network_repository.get_fewest_stops_journey(
+                from_station_name, to_station_name
+            ),
+        )
+        _print_journey(
+            "Fewest interchanges",
+            network_repository.get_fewest_interchanges_journey(
+                from_station_name, to_station_name
+            ),
+        )
+
+
+def _input_coordinate() -> Optional[tuple[float, float]]:
+    try:
+        longitude = float(input("Enter the longitude: "))
+        latitude = float(input("Enter the latitude: "))
+    except ValueError:
+        print("Longitude and latitude should be numbers")
+        return None
+    if not (math.isfinite(longitude) and math.isfinite(latitude)):
+        print("Longitude and latitude should be finite numbers")
+        return None
+    return longitude, latitude
+
+
+def _print_station_distances(station_distances: list[StationDistance]):
+    if not station_distances:
+        print("No stations found")
+    for station, distance in station_distances:
+        print(f"{station} - {distance:.0f} metres")
+
+
+def _handle_nearest_stations_query(
+    network_repository: repositories.LondonTubeNetworkRepository,
+):
+    coordinate = _input_coordinate()
+    if coordinate is None:
+        return
+    try:
+        count = int(input("Enter the number of stations: "))
+    except ValueError:
+        print("Number of stations should be an integer")
+        return
+    _print_station_distances(
+        network_repository.get_nearest_stations(*coordinate, count)
+    )
+
+
+def _handle_stations_within_radius_query(
+    network_repository: repositories.LondonTubeNetworkRepository,
+):
+    coordinate = _input_coordinate()
+    if coordinate is None:
+        return
+    try:
+        radius = float(input("Enter the radius in metres: "))
+    except ValueError:
+        print("Radius should be a number")
+        return
+    if not math.isfinite(radius):
+        print("Radius should be a finite number")
+        return
+    _print_station_distances(
+        network_repository.get_stations_within_radius(*coordinate, radius)
+    )
+
+
 def _handle_exit():
     exit(0)
 
@@ -100,6 +229,12 @@ def user_input_loop(
             _handle_by_station_name_query(network_repository)
         elif query_number == constants.QUERY_BY_STATION_ID_NUMBER:
             _handle_by_station_id_query(network_repository)
+        elif query_number == constants.QUERY_JOURNEY_NUMBER:
+            _handle_journey_query(network_repository)
+        elif query_number == constants.QUERY_NEAREST_STATIONS_NUMBER:
+            _handle_nearest_stations_query(network_repository)
+        elif query_number == constants.QUERY_STATIONS_WITHIN_RADIUS_NUMBER:
+            _handle_stations_within_radius_query(network_repository)
         elif query_number == constants.EXIT_INPUT:
             _handle_exit()
         else:
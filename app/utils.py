@@ -1,12 +1,195 @@
+import dataclasses
+import hashlib
 import json
 import os
-from typing import Any
+from decimal import Decimal
+from itertools import islice
+from typing import IO, Any, Collection, Iterable, Iterator, Optional, TypeVar
 
+T = TypeVar("T")
 
-def read_json(file_path: str) -> dict[str, Any]:
-    """Read json file"""
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARACTERS = "0123456789+-.eE"
+
+
+def _check_json_file(file_path: str):
     if not os.path.isfile(file_path) or file_path.split(".")[-1] != "json":
         raise ValueError("No valid file was specified")
 
+
+def read_json(file_path: str) -> dict[str, Any]:
+    """Read json file"""
+    _check_json_file(file_path)
+
     with open(file_path) as file:
         return json.load(file)
+
+
+class _JsonStream:
+    """Decode json values one by one from a file read in blocks"""
+
+    def __init__(self, file: IO[str], block_size: int):
+        self._file = file
+        self._block_size = block_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Read next block dropping the already decoded part of buffer"""
+        if self._eof:
+            return False
+        block = self._file.read(self._block_size)
+        if not block:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._position :] + block
+        self._position = 0
+        return True
+
+    def peek(self) -> str:
+        """Return next non-whitespace character without consuming it"""
+        while True:
+            while (
+                self._position < len(self._buffer)
+                and self._buffer[self._position] in _WHITESPACE
+            ):
+                self._position += 1
+            if self._position < len(self._buffer) or not self._fill():
+                return self._buffer[self._position : self._position + 1]
+
+    def expect(self, character: str):
+        if self.peek() != character:
+            raise ValueError(f"Invalid json: expected '{character}'")
+        self._position += 1
+
+    def decode(self) -> Any:
+        """Decode next json value waiting for more data if it is cut off"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(
+                    self._buffer, self._position
+                )
+            except json.JSONDecodeError as error:
+                if self._fill():
+                    continue
+                raise ValueError(f"Invalid json: {error}") from error
+            # a number at the end of buffer may continue in the next block,
+            # also when cut after its decimal point or exponent sign
+            if (
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and not self._buffer[end:].strip(_NUMBER_CHARACTERS)
+                and self._fill()
+            ):
+                continue
+            self._position = end
+            return value
+
+
+# marks the start of a top level member in _iter_json_members
+_MEMBER_START = object()
+
+
+def _iter_json_members(
+    file_path: str, keys: Collection[str], block_size: int
+) -> Iterator[tuple[str, Any]]:
+    """Yield (key, _MEMBER_START) for every top level key of the file
+
+    Followed by (key, item) for items of the arrays under keys.
+    """
+    _check_json_file(file_path)
+
+    with open(file_path) as file:
+        stream = _JsonStream(file, block_size)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            key = stream.decode()
+            stream.expect(":")
+            yield key, _MEMBER_START
+            if key in keys and stream.peek() == "[":
+                stream.expect("[")
+                if stream.peek() != "]":
+                    while True:
+                        yield key, stream.decode()
+                        if stream.peek() != ",":
+                            break
+                        stream.expect(",")
+                stream.expect("]")
+            else:
+                stream.decode()
+
+            if stream.peek() != ",":
+                break
+            stream.expect(",")
+        stream.expect("}")
+
+
+def iter_json_arrays(
+    file_path: str,
+    keys: Collection[str],
+    block_size: int = 1 << 16,
+) -> Iterator[tuple[str, Any]]:
+    """Yield (key, item) for items of the top level arrays under keys
+
+    The file is parsed incrementally, so only one item is kept in memory
+    at a time. Values under other keys are decoded and dropped.
+    """
+    for key, item in _iter_json_members(file_path, keys, block_size):
+        if item is not _MEMBER_START:
+            yield key, item
+
+
+def read_json_keys(
+    file_path: str,
+    array_keys: Collection[str],
+    block_size: int = 1 << 16,
+) -> set[str]:
+    """Return the top level keys of the file
+
+    Arrays under array_keys are parsed one item at a time like in
+    iter_json_arrays, so the whole file is never kept in memory.
+    """
+    return {
+        key
+        for key, item in _iter_json_members(file_path, array_keys, block_size)
+        if item is _MEMBER_START
+    }
+
+
+def chunked(
+    iterable: Iterable[T], chunk_size: Optional[int]
+) -> Iterator[list[T]]:
+    """Split iterable into lists of chunk_size items, one list if None"""
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError("chunk_size should be at least 1")
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+        if chunk_size is None:
+            return
+
+
+def file_sha256(file_path: str) -> str:
+    """Return hex digest of the file content"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def json_default(value: Any) -> Any:
+    """Serialize models and numeric columns, json.dumps default hook"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
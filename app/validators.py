@@ -1,10 +1,58 @@
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
 from typing import Any
 
 from app import constants
 
+# valid records and (issue message, record) pairs of a validated chunk
+ValidatedChunk = tuple[list[dict[str, Any]], list[tuple[str, Any]]]
+# (index in the chunk, issue message) pairs of the invalid records, only
+# these travel back from validation workers
+ChunkIssues = list[tuple[int, str]]
 
-def validate_station(station_raw: dict[str, Any]):
-    """Check whether the station data read from file is valid"""
+
+@dataclass
+class ValidationReport:
+    """Counts of the skipped records by table and reason with samples"""
+
+    max_samples: int = constants.VALIDATION_REPORT_MAX_SAMPLES
+    valid_counts: Counter[str] = field(default_factory=Counter)
+    issue_counts: dict[str, Counter[str]] = field(
+        default_factory=lambda: defaultdict(Counter)
+    )
+    samples: dict[tuple[str, str], list[Any]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+
+    def add_valid(self, table: str, count: int):
+        self.valid_counts[table] += count
+
+    def add_issue(self, table: str, issue_message: str, record: Any):
+        self.issue_counts[table][issue_message] += 1
+        samples = self.samples[table, issue_message]
+        if len(samples) < self.max_samples:
+            samples.append(record)
+
+    def get_skipped_count(self, table: str) -> int:
+        return sum(self.issue_counts[table].values())
+
+    def format(self, table: str) -> str:
+        """Describe the skipped records of the table, one reason a line"""
+        return "\n".join(
+            f"  {count} skipped: {issue_message}, e.g."
+            f" {self.samples[table, issue_message][0]}"
+            for issue_message, count in self.issue_counts[table].most_common()
+        )
+
+
+def validate_station(
+    station_raw: dict[str, Any], check_london_bounds: bool = False
+):
+    """Check whether the station data read from file is valid
+
+    Coordinates outside the tube network area are issues only with
+    check_london_bounds, other networks are loaded unchanged.
+    """
     result = ""
     if constants.ID not in station_raw:
         result = f"{constants.ID} is missing"
@@ -14,16 +62,28 @@ def validate_station(station_raw: dict[str, Any]):
         result = f"{constants.LONGITUDE} is missing"
     elif constants.LATITUDE not in station_raw:
         result = f"{constants.LATITUDE} is missing"
-    elif len(station_raw[constants.ID]) != constants.STATION_ID_LENGTH:
-        result = f"{constants.ID} length is other than expected"
     elif not isinstance(station_raw[constants.ID], str):
         result = f"{constants.ID} has wrong type"
+    elif len(station_raw[constants.ID]) != constants.STATION_ID_LENGTH:
+        result = f"{constants.ID} length is other than expected"
     elif not isinstance(station_raw[constants.NAME], str):
         result = f"{constants.NAME} has wrong type"
     elif not isinstance(station_raw[constants.LONGITUDE], float):
         result = f"{constants.LONGITUDE} has wrong type"
     elif not isinstance(station_raw[constants.LATITUDE], float):
         result = f"{constants.LATITUDE} has wrong type"
+    elif check_london_bounds and not (
+        constants.LONDON_MIN_LONGITUDE
+        <= station_raw[constants.LONGITUDE]
+        <= constants.LONDON_MAX_LONGITUDE
+    ):
+        result = f"{constants.LONGITUDE} is out of London bounds"
+    elif check_london_bounds and not (
+        constants.LONDON_MIN_LATITUDE
+        <= station_raw[constants.LATITUDE]
+        <= constants.LONDON_MAX_LATITUDE
+    ):
+        result = f"{constants.LATITUDE} is out of London bounds"
     return result
 
 
@@ -48,3 +108,41 @@ def validate_line(line_raw: dict[str, Any]):
     ):
         result = "one or more station id has other length than expected"
     return result
+
+
+def split_chunk(
+    records: list[dict[str, Any]], issues: ChunkIssues
+) -> ValidatedChunk:
+    """Split records into valid ones and (issue message, record) pairs
+
+    Issues come in index order, valid records between them are sliced.
+    """
+    valid: list[dict[str, Any]] = []
+    invalid: list[tuple[str, Any]] = []
+    start = 0
+    for index, issue_message in issues:
+        valid.extend(records[start:index])
+        invalid.append((issue_message, records[index]))
+        start = index + 1
+    valid.extend(records[start:])
+    return valid, invalid
+
+
+def validate_stations(
+    stations_raw: list[dict[str, Any]], check_london_bounds: bool = False
+) -> ChunkIssues:
+    """Return issues of the stations by index, runs in worker processes"""
+    return [
+        (index, issue_message)
+        for index, station in enumerate(stations_raw)
+        if (issue_message := validate_station(station, check_london_bounds))
+    ]
+
+
+def validate_lines(lines_raw: list[dict[str, Any]]) -> ChunkIssues:
+    """Return issues of the lines by index, runs in worker processes"""
+    return [
+        (index, issue_message)
+        for index, line in enumerate(lines_raw)
+        if (issue_message := validate_line(line))
+    ]
@@ -0,0 +1,305 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator
+
+from app import databases, loaders, repositories
+from benchmarks.synthetic_network import (
+    add_network_arguments,
+    generate_network,
+)
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(__file__), "results")
+# share of looked up keys which are not in the network
+MISSING_KEYS_SHARE = 0.1
+
+
+@contextlib.contextmanager
+def _measure(result: dict[str, Any], trace_memory: bool) -> Iterator[None]:
+    """Record seconds and, when tracing, peak traced bytes of the block"""
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        result["seconds"] = time.perf_counter() - start
+        if trace_memory:
+            result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+
+def _latency_stats(latencies_ns: list[int]) -> dict[str, float]:
+    if len(latencies_ns) < 2:
+        # quantiles needs two samples, a single one is every percentile
+        p50 = p99 = float(latencies_ns[0])
+    else:
+        percentiles = statistics.quantiles(
+            latencies_ns, n=100, method="inclusive"
+        )
+        p50, p99 = percentiles[49], percentiles[98]
+    return {
+        "calls": len(latencies_ns),
+        "mean_us": statistics.fmean(latencies_ns) / 1000,
+        "p50_us": p50 / 1000,
+        "p99_us": p99 / 1000,
+        "max_us": max(latencies_ns) / 1000,
+    }
+
+
+def _time_calls(
+    query: Callable[[Any], Any], arguments: list[Any]
+) -> dict[str, float]:
+    latencies_ns = []
+    for argument in arguments:
+        start = time.perf_counter_ns()
+        query(argument)
+        latencies_ns.append(time.perf_counter_ns() - start)
+    return _latency_stats(latencies_ns)
+
+
+def _sample_keys(
+    random_generator: random.Random, keys: list[str], count: int
+) -> list[str]:
+    """Sample existing keys mixing in some missing ones"""
+    return [
+        f"missing {index}"
+        if random_generator.random() < MISSING_KEYS_SHARE
+        else random_generator.choice(keys)
+        for index in range(count)
+    ]
+
+
+def _benchmark_queries(
+    network_repository: repositories.LondonTubeNetworkRepository,
+    network: dict[str, Any],
+    queries_count: int,
+    journeys_count: int,
+    bulk_size: int,
+    seed: int,
+) -> dict[str, dict[str, float]]:
+    random_generator = random.Random(seed)
+    station_ids = [station["id"] for station in network["stations"]]
+    station_names = [station["name"] for station in network["stations"]]
+    line_names = [line["name"] for line in network["lines"]]
+
+    def bulk_keys(keys: list[str]) -> list[list[str]]:
+        return [
+            _sample_keys(random_generator, keys, bulk_size)
+            for _ in range(max(queries_count // bulk_size, 1))
+        ]
+
+    results = {
+        "get_lines_by_station_id": _time_calls(
+            network_repository.get_lines_by_station_id,
+            _sample_keys(random_generator, station_ids, queries_count),
+        ),
+        "get_lines_by_station_name": _time_calls(
+            network_repository.get_lines_by_station_name,
+            _sample_keys(random_generator, station_names, queries_count),
+        ),
+        "get_stations_by_line_name": _time_calls(
+            network_repository.get_stations_by_line_name,
+            _sample_keys(random_generator, line_names, queries_count),
+        ),
+        "get_lines_by_station_ids": _time_calls(
+            network_repository.get_lines_by_station_ids,
+            bulk_keys(station_ids),
+        ),
+        "get_lines_by_station_names": _time_calls(
+            network_repository.get_lines_by_station_names,
+            bulk_keys(station_names),
+        ),
+        "get_stations_by_line_names": _time_calls(
+            network_repository.get_stations_by_line_names,
+            bulk_keys(line_names),
+        ),
+    }
+    if journeys_count:
+        station_name_pairs = [
+            (
+                random_generator.choice(station_names),
+                random_generator.choice(station_names),
+            )
+            for _ in range(journeys_count)
+        ]
+        results["get_fewest_stops_journey"] = _time_calls(
+            lambda names: network_repository.get_fewest_stops_journey(*names),
+            station_name_pairs,
+        )
+        results["get_fewest_interchanges_journey"] = _time_calls(
+            lambda names: network_repository.get_fewest_interchanges_journey(
+                *names
+            ),
+            station_name_pairs,
+        )
+        coordinates = [
+            (station["longitude"], station["latitude"])
+            for station in random_generator.choices(
+                network["stations"], k=queries_count
+            )
+        ]
+        results["get_nearest_stations"] = _time_calls(
+            lambda coordinate: network_repository.get_nearest_stations(
+                coordinate[0], coordinate[1], 5
+            ),
+            coordinates,
+        )
+    return results
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict[str, Any]:
+    results: dict[str, Any] = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "parameters": vars(args),
+        "environment": {
+            "python": sys.version,
+            "platform": platform.platform(),
+        },
+    }
+
+    network = generate_network(
+        args.stations, args.lines, args.stations_per_line, args.seed
+    )
+    database = databases.SQLiteDB(args.sqlite)
+    # the cache would turn repeated lookups into dictionary hits
+    network_repository = repositories.LondonTubeNetworkRepository(
+        database, use_network_graph=False
+    )
+    network_repository.create_tables_if_not_exists()
+    loader = loaders.LondonTubeNetworkLoader(
+        network_repository, validation_workers=args.validation_workers
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "network.json")
+        with open(file_path, "w") as file:
+            json.dump(network, file)
+        results["load"] = {"stream_chunk_size": args.stream_chunk_size}
+        with _measure(results["load"], args.trace_memory):
+            with contextlib.redirect_stdout(io.StringIO()):
+                if args.stream_chunk_size:
+                    loader.stream_initial_data(
+                        file_path, args.stream_chunk_size
+                    )
+                else:
+                    loader.load_initial_data(file_path)
+
+    results["network_graph"] = {}
+    with _measure(results["network_graph"], args.trace_memory):
+        network_repository.get_network_graph()
+
+    results["queries"] = {
+        "sql": _benchmark_queries(
+            network_repository,
+            network,
+            args.queries,
+            journeys_count=0,
+            bulk_size=args.bulk_size,
+            seed=args.seed,
+        )
+    }
+    graph_repository = repositories.LondonTubeNetworkRepository(database)
+    graph_repository.get_network_graph()
+    results["queries"]["network_graph"] = _benchmark_queries(
+        graph_repository,
+        network,
+        args.queries,
+        journeys_count=args.journeys,
+        bulk_size=args.bulk_size,
+        seed=args.seed,
+    )
+    database.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Load a synthetic network into SQLite and measure load time,"
+            " peak memory and query latencies"
+        )
+    )
+    add_network_arguments(parser)
+    parser.add_argument(
+        "--sqlite",
+        default=":memory:",
+        help="Specify the SQLite database file (defaults to :memory:)",
+    )
+    parser.add_argument(
+        "--queries",
+        type=int,
+        default=1_000,
+        help="Specify the calls of every lookup (defaults to 1000)",
+    )
+    parser.add_argument(
+        "--journeys",
+        type=int,
+        default=100,
+        help="Specify the calls of every journey query (defaults to 100)",
+    )
+    parser.add_argument(
+        "--bulk-size",
+        type=int,
+        default=100,
+        help="Specify the keys of a bulk lookup call (defaults to 100)",
+    )
+    parser.add_argument(
+        "--stream-chunk-size",
+        type=int,
+        required=False,
+        help="Load the network with the streaming loader in such chunks",
+    )
+    parser.add_argument(
+        "--validation-workers",
+        type=int,
+        default=0,
+        help="Specify the loader validation processes (defaults to 0)",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Record peak memory with tracemalloc, which slows Python down",
+    )
+    parser.add_argument(
+        "--output",
+        required=False,
+        help=f"Specify the results json file (defaults to {RESULTS_DIRECTORY}/<time>.json)",
+    )
+    args = parser.parse_args()
+    if args.queries < 1:
+        parser.error("--queries should be at least 1")
+    if args.journeys < 0:
+        parser.error("--journeys should not be negative")
+
+    results = run_benchmarks(args)
+    output = args.output or os.path.join(
+        RESULTS_DIRECTORY,
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"load: {results['load']['seconds']:.2f}s")
+    print(f"network graph: {results['network_graph']['seconds']:.2f}s")
+    for mode, queries in results["queries"].items():
+        for query, stats in queries.items():
+            print(
+                f"{mode} {query}: p50 {stats['p50_us']:.0f}us"
+                f" p99 {stats['p99_us']:.0f}us"
+            )
+    print(f"Results have been written to {output}")
+
+
+if __name__ == "__main__":
+    main()
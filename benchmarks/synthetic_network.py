@@ -0,0 +1,109 @@
+import argparse
+import json
+import random
+from typing import Any
+
+from app import constants
+
+STATION_ID_PREFIX = "940G"
+
+
+def _station_id(index: int) -> str:
+    digits = constants.STATION_ID_LENGTH - len(STATION_ID_PREFIX)
+    return f"{STATION_ID_PREFIX}{index:0{digits}d}"
+
+
+def generate_network(
+    stations_count: int,
+    lines_count: int,
+    stations_per_line: int,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """Generate a network in the schema of the seed data file
+
+    Stations are spread uniformly over the London bounds and every line
+    passes through distinct stations, the same seed gives the same
+    network.
+    """
+    random_generator = random.Random(seed)
+    stations = [
+        {
+            constants.ID: _station_id(index),
+            constants.NAME: f"Station {index}",
+            constants.LONGITUDE: round(
+                random_generator.uniform(
+                    constants.LONDON_MIN_LONGITUDE,
+                    constants.LONDON_MAX_LONGITUDE,
+                ),
+                6,
+            ),
+            constants.LATITUDE: round(
+                random_generator.uniform(
+                    constants.LONDON_MIN_LATITUDE,
+                    constants.LONDON_MAX_LATITUDE,
+                ),
+                6,
+            ),
+        }
+        for index in range(stations_count)
+    ]
+    line_length = min(stations_per_line, stations_count)
+    lines = [
+        {
+            constants.NAME: f"Line {index}",
+            constants.STATIONS: [
+                _station_id(station_index)
+                for station_index in random_generator.sample(
+                    range(stations_count), line_length
+                )
+            ],
+        }
+        for index in range(lines_count)
+    ]
+    return {constants.STATIONS: stations, constants.LINES: lines}
+
+
+def add_network_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--stations",
+        type=int,
+        default=10_000,
+        help="Specify the number of stations (defaults to 10000)",
+    )
+    parser.add_argument(
+        "--lines",
+        type=int,
+        default=1_000,
+        help="Specify the number of lines (defaults to 1000)",
+    )
+    parser.add_argument(
+        "--stations-per-line",
+        type=int,
+        default=30,
+        help="Specify the number of stations of a line (defaults to 30)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Specify the random seed of the network (defaults to 0)",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic network json file"
+    )
+    add_network_arguments(parser)
+    parser.add_argument("output", help="Specify the json file to write")
+    args = parser.parse_args()
+
+    network = generate_network(
+        args.stations, args.lines, args.stations_per_line, args.seed
+    )
+    with open(args.output, "w") as file:
+        json.dump(network, file)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,22 @@
 #!/usr/bin/env python3
 
 import argparse
+import contextlib
+import sys
+from typing import Optional
 
-from app import databases, repositories
-from app.init_utils import add_app_arguments, initialize_db
+from app import databases, http_server, repositories, snapshot
+from app.abstractions import Database
+from app.cache import LRUCache
+from app.init_utils import (
+    add_app_arguments,
+    build_snapshot,
+    initialize_db,
+    precompute_distances,
+    run_batch,
+    write_metrics,
+)
+from app.metrics import Metrics, MetricsHook
 from app.user_queries_helpers import user_input_loop
 
 
@@ -12,17 +25,86 @@ def main():
     add_app_arguments(parser)
     args = parser.parse_args()
 
-    postgre_db = databases.PostgreDB(
-        database=args.database,
-        user=args.user,
-        password=args.password,
-        host=args.host,
-        port=args.port,
+    metrics = Metrics() if args.metrics else None
+    try:
+        run_app(args, metrics)
+    finally:
+        # the menu leaves with SystemExit and the server with Ctrl+C
+        if metrics is not None:
+            write_metrics(metrics, args.metrics)
+
+
+def run_app(args: argparse.Namespace, metrics: Optional[Metrics]):
+    cache = (
+        LRUCache(max_size=args.cache_size, ttl=args.cache_ttl)
+        if args.cache_size
+        else None
+    )
+    if args.snapshot:
+        network_repository = repositories.LondonTubeNetworkRepository(
+            None,
+            cache=cache,
+            network_graph=snapshot.read_snapshot(args.snapshot),
+        )
+        run_queries(network_repository, args)
+        return
+
+    database: Database
+    if args.sqlite:
+        database = databases.SQLiteDB(
+            args.sqlite, slow_query_threshold=args.slow_query_threshold
+        )
+    else:
+        database = databases.PostgreDB(
+            database=args.database,
+            user=args.user,
+            password=args.password,
+            host=args.host,
+            port=args.port,
+            min_connections=args.min_connections,
+            max_connections=args.max_connections,
+            checkout_timeout=args.checkout_timeout,
+            slow_query_threshold=args.slow_query_threshold,
+        )
+    if metrics is not None:
+        database.add_hook(MetricsHook(metrics))
+    network_repository = repositories.LondonTubeNetworkRepository(
+        database, cache=cache, metrics=metrics
     )
-    network_repository = repositories.LondonTubeNetworkRepository(postgre_db)
-    initialize_db(network_repository)
+    # batch results may go to stdout, loading messages must not mix in
+    with contextlib.redirect_stdout(sys.stderr if args.batch else sys.stdout):
+        initialize_db(
+            network_repository,
+            stream_chunk_size=args.stream_chunk_size,
+            sync=args.sync,
+            validation_workers=args.validation_workers,
+            metrics=metrics,
+            check_london_bounds=args.london_bounds,
+        )
+        if args.build_snapshot:
+            build_snapshot(network_repository, args.build_snapshot)
+            return
+        if args.precompute_distances:
+            precompute_distances(network_repository)
+
+    run_queries(network_repository, args)
+
 
-    user_input_loop(network_repository)
+def run_queries(
+    network_repository: repositories.LondonTubeNetworkRepository,
+    args: argparse.Namespace,
+):
+    if args.batch:
+        run_batch(network_repository, args.batch, args.batch_output)
+    elif args.http_port is not None:
+        http_server.serve(
+            network_repository,
+            host=args.http_host,
+            port=args.http_port,
+            workers=args.http_workers,
+        )
+    else:
+        user_input_loop(network_repository)
 
 
 if __name__ == "__main__":
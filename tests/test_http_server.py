@@ -0,0 +1,50 @@
+import http.client
+import threading
+
+import pytest
+
+from app import constants
+from app.databases import SQLiteDB
+from app.http_server import PooledHTTPServer
+from app.repositories import LondonTubeNetworkRepository
+
+
+@pytest.fixture
+def repository():
+    repository = LondonTubeNetworkRepository(SQLiteDB(":memory:"))
+    repository.create_tables_if_not_exists()
+    return repository
+
+
+@pytest.fixture
+def connection(repository):
+    with PooledHTTPServer(("127.0.0.1", 0), repository, workers=1) as server:
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        connection = http.client.HTTPConnection(
+            "127.0.0.1", server.server_port, timeout=5
+        )
+        yield connection
+        connection.close()
+        server.shutdown()
+        thread.join()
+
+
+def test_failed_lookup_answers_500_and_keeps_connection(
+    repository, connection, monkeypatch
+):
+    def fail(*args, **kwargs):
+        raise RuntimeError("database is gone")
+
+    monkeypatch.setattr(repository, "get_network_graph", fail)
+    path = f"{constants.HTTP_LINES_PATH}?{constants.STATION_NAME}=Bank"
+    connection.request("GET", path)
+    response = connection.getresponse()
+    assert response.status == 500
+    assert response.read() == b'{"error": "internal server error"}'
+
+    monkeypatch.undo()
+    connection.request("GET", path)
+    response = connection.getresponse()
+    assert response.status == 200
+    assert response.read() == b'{"result": []}'
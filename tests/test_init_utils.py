@@ -0,0 +1,44 @@
+import argparse
+
+import pytest
+
+from app.init_utils import add_app_arguments
+
+
+@pytest.fixture
+def parser():
+    parser = argparse.ArgumentParser()
+    add_app_arguments(parser)
+    return parser
+
+
+@pytest.mark.parametrize(
+    "arguments",
+    [
+        ["--stream-chunk-size", "0"],
+        ["--validation-workers", "-1"],
+        ["--min-connections", "-1"],
+        ["--max-connections", "0"],
+        ["--http-workers", "0"],
+        ["--cache-size", "-1"],
+        ["--cache-size", "x"],
+    ],
+)
+def test_out_of_range_numbers_are_parser_errors(parser, arguments):
+    with pytest.raises(SystemExit):
+        parser.parse_args(arguments)
+
+
+def test_boundary_numbers_are_accepted(parser):
+    args = parser.parse_args(
+        [
+            "--stream-chunk-size=1",
+            "--validation-workers=0",
+            "--min-connections=0",
+            "--max-connections=1",
+            "--http-workers=1",
+            "--cache-size=0",
+        ]
+    )
+    assert args.validation_workers == 0
+    assert args.cache_size == 0
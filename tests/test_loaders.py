@@ -0,0 +1,97 @@
+import contextlib
+import io
+import json
+
+import pytest
+
+from app import constants
+from app.databases import SQLiteDB
+from app.loaders import LondonTubeNetworkLoader
+from app.repositories import LondonTubeNetworkRepository
+
+
+@pytest.fixture
+def seed_data():
+    with open(constants.SEED_DATA_FILE_PATH) as file:
+        return json.load(file)
+
+
+@pytest.fixture
+def repository():
+    repository = LondonTubeNetworkRepository(SQLiteDB(":memory:"))
+    repository.create_tables_if_not_exists()
+    return repository
+
+
+def _stream(repository, file_path, chunk_size=50):
+    with contextlib.redirect_stdout(io.StringIO()):
+        LondonTubeNetworkLoader(repository).stream_initial_data(
+            str(file_path), chunk_size
+        )
+
+
+def test_stream_loads_lines_listed_before_stations(
+    repository, seed_data, tmp_path
+):
+    file_path = tmp_path / "lines_first.json"
+    file_path.write_text(
+        json.dumps(
+            {
+                constants.LINES: seed_data[constants.LINES],
+                constants.STATIONS: seed_data[constants.STATIONS],
+            }
+        )
+    )
+    _stream(repository, file_path)
+
+    lines = repository.get_lines_by_station_name("Baker Street")
+    assert {line.name for line in lines} >= {"Bakerloo", "Jubilee"}
+    manifest = repository.get_load_manifest()
+    assert manifest[constants.LINES].row_count == len(
+        seed_data[constants.LINES]
+    )
+
+
+def test_lines_without_loaded_stations_raise(repository, seed_data, tmp_path):
+    file_path = tmp_path / "bad_stations.json"
+    stations = [
+        {**station, constants.ID: "bad"}
+        for station in seed_data[constants.STATIONS]
+    ]
+    file_path.write_text(
+        json.dumps(
+            {
+                constants.STATIONS: stations,
+                constants.LINES: seed_data[constants.LINES],
+            }
+        )
+    )
+    with pytest.raises(ValueError, match="No stations are loaded"):
+        _stream(repository, file_path)
+    assert not repository.get_load_manifest()[constants.STATIONS].is_complete
+
+
+def test_rejected_lines_are_loaded_again(repository, seed_data, tmp_path):
+    file_path = tmp_path / "unknown_stations.json"
+    lines = [
+        {**line, constants.STATIONS: ["940GZZLUXXX"]}
+        for line in seed_data[constants.LINES]
+    ]
+    file_path.write_text(
+        json.dumps(
+            {
+                constants.STATIONS: seed_data[constants.STATIONS],
+                constants.LINES: lines,
+            }
+        )
+    )
+    _stream(repository, file_path)
+    assert not repository.get_load_manifest()[constants.LINES].is_complete
+
+    file_path.write_text(json.dumps(seed_data))
+    _stream(repository, file_path)
+    manifest = repository.get_load_manifest()
+    assert manifest[constants.LINES].is_complete
+    assert manifest[constants.LINES].row_count == len(
+        seed_data[constants.LINES]
+    )
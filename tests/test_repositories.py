@@ -0,0 +1,55 @@
+import contextlib
+import dataclasses
+import io
+
+import pytest
+
+from app import constants
+from app.cache import LRUCache
+from app.databases import SQLiteDB
+from app.loaders import LondonTubeNetworkLoader
+from app.repositories import LondonTubeNetworkRepository
+
+
+@pytest.fixture
+def repository():
+    repository = LondonTubeNetworkRepository(
+        SQLiteDB(":memory:"), cache=LRUCache()
+    )
+    repository.create_tables_if_not_exists()
+    with contextlib.redirect_stdout(io.StringIO()):
+        LondonTubeNetworkLoader(repository).load_initial_data(
+            constants.SEED_DATA_FILE_PATH
+        )
+    return repository
+
+
+def test_cached_results_cannot_be_changed_by_callers(repository):
+    lines = repository.get_lines_by_station_name("Baker Street")
+    lines.clear()
+    assert repository.get_lines_by_station_name("Baker Street")
+
+    journey = repository.get_fewest_stops_journey("Baker Street", "Bank")
+    assert journey is not None
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        journey.legs = ()  # type: ignore[misc]
+    assert repository.get_fewest_stops_journey(
+        "Baker Street", "Bank"
+    ).legs == journey.legs
+
+
+def test_graph_loaded_across_a_write_is_not_kept(repository, monkeypatch):
+    load_network_graph = repository._load_network_graph
+
+    def load_during_write():
+        graph = load_network_graph()
+        repository._invalidate_read_data()
+        return graph
+
+    monkeypatch.setattr(repository, "_load_network_graph", load_during_write)
+    assert repository.get_network_graph() is not None
+    assert repository._network_graph is None
+
+    monkeypatch.undo()
+    graph = repository.get_network_graph()
+    assert repository.get_network_graph() is graph
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from app.utils import chunked, iter_json_arrays, read_json_keys
+
+
+@pytest.fixture
+def write_json(tmp_path):
+    def write(content: str) -> str:
+        file_path = tmp_path / "data.json"
+        file_path.write_text(content)
+        return str(file_path)
+
+    return write
+
+
+# small blocks cut strings, escapes and numbers between reads
+@pytest.fixture(params=[1, 3, 1 << 16])
+def block_size(request):
+    return request.param
+
+
+def test_iter_json_arrays_yields_items_under_keys(write_json, block_size):
+    file_path = write_json(
+        '{"stations": [{"id": 1}, {"id": 2}], "other": [3],'
+        ' "lines": [{"name": "a"}]}'
+    )
+    items = list(
+        iter_json_arrays(file_path, ("stations", "lines"), block_size)
+    )
+    assert items == [
+        ("stations", {"id": 1}),
+        ("stations", {"id": 2}),
+        ("lines", {"name": "a"}),
+    ]
+
+
+def test_iter_json_arrays_decodes_escapes(write_json, block_size):
+    names = ['quote " here', "back\\slash", "new\nline", "café ☃"]
+    file_path = write_json(json.dumps({"names": names}))
+    items = list(iter_json_arrays(file_path, ("names",), block_size))
+    assert items == [("names", name) for name in names]
+
+
+def test_iter_json_arrays_keeps_nested_values(write_json, block_size):
+    value = {"a": [1, [2, {"b": None}]], "c": {"d": [True, 1.5e3]}}
+    file_path = write_json(
+        json.dumps({"skipped": {"items": [value]}, "items": [value, []]})
+    )
+    items = list(iter_json_arrays(file_path, ("items",), block_size))
+    assert items == [("items", value), ("items", [])]
+
+
+def test_iter_json_arrays_reads_numbers_cut_by_blocks(write_json):
+    file_path = write_json('{"numbers": [12345, -0.5, 6e10]}')
+    items = list(iter_json_arrays(file_path, ("numbers",), block_size=2))
+    assert items == [("numbers", 12345), ("numbers", -0.5), ("numbers", 6e10)]
+
+
+def test_iter_json_arrays_handles_empty_values(write_json, block_size):
+    assert list(iter_json_arrays(write_json("{}"), ("a",), block_size)) == []
+    file_path = write_json(' { "a" : [ ] , "b" : "[1]" } ')
+    assert list(iter_json_arrays(file_path, ("a", "b"), block_size)) == []
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        '{"items": [1, 2',
+        '{"items": [{"a": 1}, {"a": ',
+        '{"items": ["unterminated',
+        '{"items": [1, 2]',
+        '{"items" [1]}',
+        "[1, 2]",
+        "",
+    ],
+)
+def test_iter_json_arrays_rejects_truncated_input(
+    write_json, block_size, content
+):
+    with pytest.raises(ValueError, match="Invalid json"):
+        list(iter_json_arrays(write_json(content), ("items",), block_size))
+
+
+def test_read_json_keys_returns_top_level_keys(write_json, block_size):
+    file_path = write_json(
+        '{"lines": [{"stations": ["x"]}], "other": {"stations": []}}'
+    )
+    assert read_json_keys(file_path, ("lines",), block_size) == {
+        "lines",
+        "other",
+    }
+
+
+def test_chunked_splits_into_lists():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked(range(3), None)) == [[0, 1, 2]]
+    assert list(chunked([], 2)) == []
+
+
+@pytest.mark.parametrize("chunk_size", [0, -1])
+def test_chunked_rejects_non_positive_size(chunk_size):
+    with pytest.raises(ValueError):
+        list(chunked(range(3), chunk_size))
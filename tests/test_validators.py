@@ -0,0 +1,41 @@
+import pytest
+
+from app import constants
+from app.validators import split_chunk, validate_stations
+
+MANCHESTER = {
+    constants.ID: "910GMNCRPIC",
+    constants.NAME: "Manchester Piccadilly",
+    constants.LONGITUDE: -2.230034,
+    constants.LATITUDE: 53.477456,
+}
+BANK = {
+    constants.ID: "940GZZLUBNK",
+    constants.NAME: "Bank",
+    constants.LONGITUDE: -0.088899,
+    constants.LATITUDE: 51.513356,
+}
+
+
+def test_stations_outside_london_are_valid_by_default():
+    assert validate_stations([MANCHESTER, BANK]) == []
+
+
+def test_london_bounds_are_checked_on_request():
+    issues = validate_stations([MANCHESTER, BANK], check_london_bounds=True)
+    assert issues == [(0, f"{constants.LONGITUDE} is out of London bounds")]
+
+
+@pytest.mark.parametrize("check_london_bounds", [False, True])
+def test_wrong_coordinate_types_are_issues(check_london_bounds):
+    station = {**BANK, constants.LATITUDE: "51.5"}
+    assert validate_stations([station], check_london_bounds) == [
+        (0, f"{constants.LATITUDE} has wrong type")
+    ]
+
+
+def test_split_chunk_keeps_order():
+    records = [{"n": index} for index in range(5)]
+    valid, invalid = split_chunk(records, [(1, "a"), (3, "b")])
+    assert valid == [{"n": 0}, {"n": 2}, {"n": 4}]
+    assert invalid == [("a", {"n": 1}), ("b", {"n": 3})]